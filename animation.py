@@ -0,0 +1,76 @@
+"""
+Carry cell changes from a solver running in a background thread to the
+GUI. The solver pushes every change into a CellFeed, and the GUI drains
+it on a timer at its own frame rate. Only the latest value of each cell
+is kept between frames, so the feed never holds more than one update
+per cell and pushing never blocks the solver, except in step mode
+where the solver deliberately waits for the user.
+
+"""
+import threading
+
+
+# Frames per second the GUI redraws the board at while solving.
+FRAME_RATE = 30
+
+
+class CellFeed():
+    """
+    A bounded, thread-safe batch of pending cell updates. push() is
+    called from the solver thread, and drain() and the controls from
+    the GUI thread.
+
+    """
+    def __init__(self, skip=False, stepping=False):
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.skip = skip
+        self.stepping = stepping
+        self.step_gate = threading.Event()
+        if not stepping:
+            self.step_gate.set()
+
+    def push(self, i, j, num):
+        """
+        Record a cell change. Does nothing while the animation is
+        skipped. In step mode, waits until step() is called.
+
+        """
+        if self.skip:
+            return
+        with self.lock:
+            self.pending[(i, j)] = num
+        if self.stepping:
+            self.step_gate.wait()
+            if self.stepping:
+                self.step_gate.clear()
+
+    def drain(self):
+        """Return the pending updates as a dict of (i, j) to num."""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return pending
+
+    def set_skip(self, skip):
+        """Stop or resume recording updates."""
+        self.skip = skip
+        if skip:
+            self.set_stepping(False)
+            self.drain()
+
+    def set_stepping(self, stepping):
+        """Switch step mode on or off. Turning it off frees the solver."""
+        self.stepping = stepping
+        if stepping:
+            self.step_gate.clear()
+        else:
+            self.step_gate.set()
+
+    def step(self):
+        """Let the solver make its next change in step mode."""
+        self.step_gate.set()
+
+    def close(self):
+        """Free a waiting solver and stop recording updates for good."""
+        self.skip = True
+        self.set_stepping(False)
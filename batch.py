@@ -0,0 +1,375 @@
+"""
+Solve a large puzzle file across a pool of worker processes. Puzzles
+are handed to the workers in chunks, and results are streamed back
+either in the order of the file or as soon as they finish. For a
+puzzle store (see puzzle_store.py), workers read their chunks straight
+from the store instead of receiving the puzzles.
+
+With --unique, puzzles are not just solved but labelled 'unique',
+'multiple', or 'unsolvable' by counting their solutions up to two, to
+screen puzzles from outside sources.
+
+With --vectorized, each chunk is propagated in one go with NumPy (see
+vector.py) and only the puzzles left open are searched; use a large
+--chunk-size with it. It applies to solving a puzzle file only, not to
+--unique or a store.
+
+Usage: python batch.py [puzzle_file] [--workers N] [--chunk-size N]
+                       [--unordered] [--timeout SECONDS]
+                       [--strategy row|mrv] [--backend search|dlx|flat]
+                       [--unique] [--vectorized] [--output FILE]
+
+"""
+import argparse
+import math
+import os
+import queue
+import time
+from collections import deque, namedtuple
+from itertools import islice
+from multiprocessing import Pool
+
+from puzzle_io import read_puzzles
+from puzzle_store import PuzzleStore, is_store, unpack_record
+from sudoku import BACKENDS, STRATEGIES, SolveTimeout, check_solution, make_solver, solve
+
+
+BatchResult = namedtuple('BatchResult', ['index', 'status', 'solution', 'elapsed'])
+
+# Seconds the command line allows each puzzle by default, so that one
+# puzzle the search cannot finish does not stall the whole run.
+DEFAULT_TIMEOUT = 10.0
+
+# Buckets of the latency histogram per doubling of the latency, so a
+# percentile read from it is within about 2% of the exact one, and the
+# smallest latency in seconds it tells apart.
+BUCKETS_PER_DOUBLING = 32
+SMALLEST_LATENCY = 1e-6
+
+# Puzzle stores mapped by this worker process, by path.
+open_stores = {}
+
+
+def solve_one(job):
+    """
+    Solve a single (index, board, options) job inside a worker process
+    and return a BatchResult. The status is 'solved', 'unsolvable', or
+    'timeout'.
+
+    """
+    index, board, options = job
+    start = time.perf_counter()
+    try:
+        solution = solve(board, **options)
+    except SolveTimeout:
+        return BatchResult(index, 'timeout', None, time.perf_counter() - start)
+    elapsed = time.perf_counter() - start
+    if solution is None:
+        return BatchResult(index, 'unsolvable', None, elapsed)
+    return BatchResult(index, 'solved', solution, elapsed)
+
+def count_one(job):
+    """
+    Count the solutions of a single (index, board, options) job up to
+    two inside a worker process and return a BatchResult. The status is
+    'unique', 'multiple', 'unsolvable', or 'timeout', and the solution
+    is given for a unique puzzle.
+
+    """
+    index, board, options = job
+    start = time.perf_counter()
+    solver = make_solver(board, options.get('backend', 'search'), timeout=options.get('timeout'))
+    try:
+        found = solver.count(2)
+    except SolveTimeout:
+        return BatchResult(index, 'timeout', None, time.perf_counter() - start)
+    elapsed = time.perf_counter() - start
+    if found == 0:
+        return BatchResult(index, 'unsolvable', None, elapsed)
+    if found == 1:
+        return BatchResult(index, 'unique', solver.solution, elapsed)
+    return BatchResult(index, 'multiple', None, elapsed)
+
+def solve_chunk(chunk):
+    """Solve a list of jobs inside a worker process."""
+    return [solve_one(job) for job in chunk]
+
+def vector_chunk(chunk):
+    """
+    Solve a list of jobs inside a worker process by propagating all of
+    their boards at once with vector.py, and searching only the boards
+    propagation leaves open. The propagation time is shared out evenly
+    between the puzzles of the chunk.
+
+    """
+    # Imported here because vector.py is built on this module and needs NumPy.
+    from vector import is_full, propagate_boards
+    start = time.perf_counter()
+    boards = propagate_boards([board for _, board, _ in chunk])
+    share = (time.perf_counter() - start) / len(chunk)
+    results = []
+    for (index, _, options), board in zip(chunk, boards):
+        if board is None:
+            results.append(BatchResult(index, 'unsolvable', None, share))
+        elif is_full(board):
+            results.append(BatchResult(index, 'solved', board, share))
+        else:
+            result = solve_one((index, board, options))
+            results.append(result._replace(elapsed=result.elapsed + share))
+    return results
+
+def count_chunk(chunk):
+    """Count the solutions of a list of jobs inside a worker process."""
+    return [count_one(job) for job in chunk]
+
+def make_chunks(jobs, chunk_size):
+    """Group an iterable of jobs into lists of chunk_size jobs."""
+    jobs = iter(jobs)
+    while True:
+        chunk = list(islice(jobs, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def store_jobs(task):
+    """
+    Yield the jobs for puzzles start to stop-1 of a puzzle store inside
+    a worker process. The worker maps the store itself, so only the
+    index range crosses the process boundary.
+
+    """
+    path, start, stop, options = task
+    store = open_stores.get(path)
+    if store is None:
+        store = open_stores[path] = PuzzleStore(path)
+    records = store.records(start, stop)
+    size = store.record_size
+    for k in range(stop - start):
+        yield (start + k, unpack_record(records[k*size:(k + 1)*size], store.packing), options)
+
+def solve_store_chunk(task):
+    """Solve a range of puzzles of a puzzle store inside a worker process."""
+    return [solve_one(job) for job in store_jobs(task)]
+
+def count_store_chunk(task):
+    """Count the solutions of a range of puzzles of a puzzle store."""
+    return [count_one(job) for job in store_jobs(task)]
+
+def dispatch(func, tasks, workers, ordered):
+    """
+    Run func on every task in a pool of worker processes and yield the
+    items of each returned list. Only a few tasks per worker are in
+    flight at once, so the tasks are never all in memory together. If
+    ordered is False, results are yielded as soon as their task is done
+    instead of in task order.
+
+    """
+    workers = workers or os.cpu_count() or 1
+    max_in_flight = workers * 2
+
+    with Pool(workers) as pool:
+        if ordered:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(func, (task,)))
+                if len(pending) >= max_in_flight:
+                    yield from pending.popleft().get()
+            while pending:
+                yield from pending.popleft().get()
+        else:
+            done = queue.Queue()
+            in_flight = 0
+            for task in tasks:
+                pool.apply_async(func, (task,), callback=done.put, error_callback=done.put)
+                in_flight += 1
+                if in_flight >= max_in_flight:
+                    yield from get_chunk(done)
+                    in_flight -= 1
+            while in_flight:
+                yield from get_chunk(done)
+                in_flight -= 1
+
+def solve_batch(boards, workers=None, chunk_size=64, ordered=True, timeout=None,
+                vectorized=False, **options):
+    """
+    Solve every board of the given iterable in a pool of worker
+    processes and yield a BatchResult for each. Boards are sent to the
+    workers chunk_size at a time, and only a few chunks per worker are
+    in flight at once, so an arbitrarily large input is never read
+    into memory all at once. If ordered is False, results are yielded
+    as soon as their chunk is done instead of in input order. The
+    timeout is applied to each puzzle separately, and any other options
+    are passed on to sudoku.solve(). If vectorized is True, each chunk
+    is propagated as a whole with NumPy first (see vector_chunk()).
+
+    """
+    options = dict(options, timeout=timeout)
+    jobs = ((index, board, options) for index, board in enumerate(boards))
+    func = vector_chunk if vectorized else solve_chunk
+    return dispatch(func, make_chunks(jobs, chunk_size), workers, ordered)
+
+def solve_store(path, workers=None, chunk_size=64, ordered=True, timeout=None, **options):
+    """
+    Like solve_batch(), but for every puzzle of a puzzle store. Each
+    worker reads its chunks straight from its own map of the store.
+
+    """
+    options = dict(options, timeout=timeout)
+    with PuzzleStore(path) as store:
+        count = len(store)
+    tasks = ((path, start, min(start + chunk_size, count), options)
+             for start in range(0, count, chunk_size))
+    return dispatch(solve_store_chunk, tasks, workers, ordered)
+
+def count_batch(boards, workers=None, chunk_size=64, ordered=True, timeout=None,
+                backend='search'):
+    """
+    Like solve_batch(), but label every board by its number of
+    solutions (see count_one()) instead of solving it.
+
+    """
+    options = {'timeout': timeout, 'backend': backend}
+    jobs = ((index, board, options) for index, board in enumerate(boards))
+    return dispatch(count_chunk, make_chunks(jobs, chunk_size), workers, ordered)
+
+def count_store(path, workers=None, chunk_size=64, ordered=True, timeout=None,
+                backend='search'):
+    """Like count_batch(), but for every puzzle of a puzzle store."""
+    with PuzzleStore(path) as store:
+        count = len(store)
+    options = {'timeout': timeout, 'backend': backend}
+    tasks = ((path, start, min(start + chunk_size, count), options)
+             for start in range(0, count, chunk_size))
+    return dispatch(count_store_chunk, tasks, workers, ordered)
+
+def get_chunk(done):
+    """Wait for the next finished chunk, raising any worker error."""
+    results = done.get()
+    if isinstance(results, BaseException):
+        raise results
+    return results
+
+def percentile(sorted_values, fraction):
+    """Return the value at the given fraction of a sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+class LatencyHistogram():
+    """
+    Latencies counted in buckets that grow geometrically from
+    SMALLEST_LATENCY, so the percentiles of any number of results are
+    kept in a few hundred counts rather than a list of them all.
+
+    """
+    def __init__(self):
+        self.buckets = {}
+        self.total = 0
+        self.max = 0.0
+
+    def add(self, latency):
+        """Count a latency in seconds."""
+        bucket = 0
+        if latency > SMALLEST_LATENCY:
+            bucket = math.ceil(math.log2(latency / SMALLEST_LATENCY) * BUCKETS_PER_DOUBLING)
+        self.buckets[bucket] = self.buckets.get(bucket, 0) + 1
+        self.total += 1
+        self.max = max(self.max, latency)
+
+    def percentile(self, fraction):
+        """
+        Return the latency at the given fraction of the counted ones, as
+        percentile() would for the sorted list, rounded up to the top of
+        its bucket.
+
+        """
+        if not self.total:
+            return 0.0
+        rank = min(self.total - 1, int(fraction * self.total))
+        for bucket in sorted(self.buckets):
+            rank -= self.buckets[bucket]
+            if rank < 0:
+                return min(self.max, SMALLEST_LATENCY * 2 ** (bucket / BUCKETS_PER_DOUBLING))
+        return self.max
+
+def main():
+    """Solve every puzzle in a file in parallel and report the throughput."""
+    parser = argparse.ArgumentParser(description='Solve a puzzle file across many processes.')
+    parser.add_argument('path', nargs='?', default='puzzles.txt',
+                        help="puzzle file or store to solve, or '-' for stdin "
+                             "(default: puzzles.txt)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='puzzles sent to a worker at a time (default: 64)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='stream results as they finish instead of in file order')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds allowed for each puzzle, or 0 for no limit '
+                             '(default: {:g})'.format(DEFAULT_TIMEOUT))
+    parser.add_argument('--strategy', choices=STRATEGIES, default='mrv',
+                        help='search order (default: mrv)')
+    parser.add_argument('--backend', choices=BACKENDS, default='search',
+                        help='solver to use (default: search)')
+    parser.add_argument('--unique', action='store_true',
+                        help='label puzzles as unique, multiple, or unsolvable instead')
+    parser.add_argument('--vectorized', action='store_true',
+                        help='propagate each chunk at once with NumPy before searching '
+                             '(puzzle files only, not with --unique)')
+    parser.add_argument('--output', default=None,
+                        help='write "index,status,solution" lines to this file')
+    args = parser.parse_args()
+
+    if args.unique:
+        counts = {'unique': 0, 'multiple': 0, 'unsolvable': 0, 'timeout': 0, 'invalid': 0}
+    else:
+        counts = {'solved': 0, 'unsolvable': 0, 'timeout': 0, 'invalid': 0}
+    from_store = args.path != '-' and is_store(args.path)
+    if args.vectorized and (args.unique or from_store):
+        parser.error('--vectorized only applies to solving a puzzle file, '
+                     'not to --unique or a puzzle store')
+    timeout = args.timeout or None
+    latencies = LatencyHistogram()
+    f_out = open(args.output, 'w') if args.output else None
+    start = time.perf_counter()
+    if args.unique and from_store:
+        results = count_store(args.path, args.workers, args.chunk_size, not args.unordered,
+                              timeout, args.backend)
+    elif args.unique:
+        results = count_batch(read_puzzles(args.path), args.workers, args.chunk_size,
+                              not args.unordered, timeout, args.backend)
+    elif from_store:
+        results = solve_store(args.path, args.workers, args.chunk_size, not args.unordered,
+                              timeout, strategy=args.strategy, backend=args.backend)
+    else:
+        results = solve_batch(read_puzzles(args.path), args.workers, args.chunk_size,
+                              not args.unordered, timeout, args.vectorized,
+                              strategy=args.strategy, backend=args.backend)
+    try:
+        for result in results:
+            status = result.status
+            if status in ('solved', 'unique') and not check_solution(result.solution):
+                status = 'invalid'
+            counts[status] += 1
+            latencies.add(result.elapsed)
+            if f_out is not None:
+                solution = ''
+                if result.solution:
+                    solution = ''.join(''.join(row) for row in result.solution)
+                f_out.write('{},{},{}\n'.format(result.index, status, solution))
+    finally:
+        if f_out is not None:
+            f_out.close()
+    elapsed = time.perf_counter() - start
+
+    total = latencies.total
+    print('Processed {} puzzles in {:.3f}s ({:.1f} puzzles/s)'.format(
+        total, elapsed, total / elapsed if elapsed else 0.0))
+    print(', '.join('{}: {}'.format(status, count) for status, count in counts.items()))
+    print('latency ms: p50 {:.2f}, p90 {:.2f}, p99 {:.2f}, max {:.2f}'.format(
+        latencies.percentile(0.50) * 1000, latencies.percentile(0.90) * 1000,
+        latencies.percentile(0.99) * 1000, latencies.max * 1000))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,567 @@
+"""
+Benchmark the solving algorithms against each other without the GUI.
+
+The strategies are the naive backtracking of main.py (which checks the
+whole board for violations after every trial), the three-board
+algorithm that fast_main.py originally used, the 'row' and 'mrv'
+strategies of the sudoku.py engine, the Dancing Links backend of
+dlx.py, and the preallocated core of flat.py. Each is run over a set
+of graded corpora, recording wall time, nodes (values tried by the
+search), backtracks, placements per second (including cells filled by
+propagation), and peak memory. Results can be written as JSON and
+compared against a stored baseline. Wall times only compare on the
+machine they were measured on, so no baseline is kept in the
+repository: save one with --save-baseline from the commit to compare
+against, then run the changed tree with --baseline.
+
+With --allocations, the search phase of each engine core is traced
+instead, over the first --allocation-sample puzzles of each corpus,
+counting the memory blocks it allocates per node, and how many of
+those were lists, sets, iterators, closures, and other objects the
+garbage collector tracks.
+
+With --imports, the time to import each of the core modules and the GUI
+entry points is measured instead, each in a fresh interpreter, along
+with which slow-loading modules (wx, argparse, NumPy) came with it.
+
+Usage: python bench.py [--corpus NAME=PATH ...] [--strategies NAME ...]
+                       [--timeout SECONDS] [--limit N] [--memory-sample N]
+                       [--allocations [--allocation-sample N]] [--imports]
+                       [--output FILE] [--baseline FILE] [--save-baseline FILE]
+
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from puzzle_io import read_puzzles
+from sudoku import (BOX_OF, SET_1_TO_9, UNITS, SolveTimeout, Solver, check_solution,
+                    check_violations, make_solver, move, solve)
+
+
+# Wall times below this many seconds are too noisy to flag as regressions.
+MIN_WALL_TIME = 0.05
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CORPORA = {
+    'easy': os.path.join(HERE, 'puzzles.txt'),
+    'hard': os.path.join(HERE, 'corpora', 'hard.txt'),
+    'minimal': os.path.join(HERE, 'corpora', 'minimal_17.txt'),
+    'size_16': os.path.join(HERE, 'corpora', 'size_16.txt'),
+    'size_25': os.path.join(HERE, 'corpora', 'size_25.txt'),
+}
+# The original algorithms only know 9x9 boards, so they are left out
+# of the corpora of other sizes.
+ONLY_9X9 = ('naive', 'three_board')
+# The engine cores whose search phase --allocations traces.
+ALLOCATION_CORES = ('row', 'mrv', 'dlx', 'flat')
+# The modules --imports times. None of them should import wx.
+IMPORT_MODULES = ('sudoku', 'play', 'puzzle_store', 'main', 'fast_main')
+# Slow-loading modules to report when an import pulls them in.
+HEAVY_MODULES = ('wx', 'argparse', 'numpy')
+# Fresh interpreters started per module, of which the median is kept.
+IMPORT_REPEAT = 5
+# Run in a fresh interpreter: time one import and print the seconds it
+# took and the heavy modules it loaded.
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+__import__(sys.argv[1])
+elapsed = time.perf_counter() - start
+print(elapsed, *[name for name in sys.argv[2:] if name in sys.modules])
+"""
+
+
+def check_deadline(deadline):
+    """Raise SolveTimeout once the deadline has passed."""
+    if deadline is not None and time.perf_counter() > deadline:
+        raise SolveTimeout()
+
+def naive_solve(board, counters, deadline=None):
+    """
+    The algorithm of main.py: try the smallest untried number in each
+    cell in row-major order and check the whole board for violations
+    after every trial.
+
+    """
+    my_board = [list(row) for row in board]
+    not_tried = dict()
+    for i, row in enumerate(my_board):
+        for j, val in enumerate(row):
+            not_tried[(i, j)] = set(SET_1_TO_9) if val == ' ' else None
+
+    direction = 'f'
+    i = 0
+    j = 0
+    while i < 9 and j < 9:
+        check_deadline(deadline)
+        if not_tried[(i, j)] is None:
+            i, j = move(i, j, direction)
+            continue
+
+        numbers_in_row = set(my_board[i])
+        found = False
+        while not_tried[(i, j)] - numbers_in_row:
+            my_board[i][j] = min(not_tried[(i, j)] - numbers_in_row)
+            not_tried[(i, j)].remove(my_board[i][j])
+            counters['nodes'] += 1
+            counters['placements'] += 1
+            if check_violations(my_board):
+                found = True
+                break
+            counters['backtracks'] += 1
+
+        if found:
+            direction = 'f'
+        else:
+            not_tried[(i, j)] = set(SET_1_TO_9)
+            my_board[i][j] = ' '
+            direction = 'b'
+        i, j = move(i, j, direction)
+
+    return my_board if direction == 'f' else None
+
+def three_board_solve(board, counters, deadline=None):
+    """
+    The algorithm fast_main.py originally used: keep the board, its
+    rotation, and its subgrids as rows of strings, find the valid
+    numbers of a cell as a set difference, fill the naked singles
+    first, and then backtrack in row-major order. The smallest valid
+    number is tried first so that runs are repeatable.
+
+    """
+    game_board = [list(row) for row in board]
+    rotated_board = [[game_board[i][j] for i in range(9)] for j in range(9)]
+    subgrid_board = [[game_board[index // 9][index % 9] for index in UNITS[18 + box]]
+                     for box in range(9)]
+    # Where each cell lives in the subgrid board.
+    subgrid_pos = {}
+    for box in range(9):
+        for k, index in enumerate(UNITS[18 + box]):
+            subgrid_pos[(index // 9, index % 9)] = (box, k)
+    numbers_tried = {(i, j): set() if game_board[i][j] == ' ' else None
+                     for i in range(9) for j in range(9)}
+
+    def check(i, j):
+        return SET_1_TO_9 - set(game_board[i]).union(
+            rotated_board[j], subgrid_board[BOX_OF[i*9 + j]], numbers_tried[(i, j)])
+
+    def insert(i, j, val):
+        game_board[i][j] = val
+        rotated_board[j][i] = val
+        box, k = subgrid_pos[(i, j)]
+        subgrid_board[box][k] = val
+
+    keep_going = True
+    while keep_going:
+        keep_going = False
+        for i in range(9):
+            for j in range(9):
+                if numbers_tried[(i, j)] is not None and len(check(i, j)) == 1:
+                    insert(i, j, check(i, j).pop())
+                    numbers_tried[(i, j)] = None
+                    counters['placements'] += 1
+                    keep_going = True
+
+    direction = 'f'
+    i = 0
+    j = 0
+    while i < 9 and j < 9:
+        check_deadline(deadline)
+        if numbers_tried[(i, j)] is None:
+            i, j = move(i, j, direction)
+            continue
+
+        valid_numbers = check(i, j)
+        if valid_numbers:
+            val = min(valid_numbers)
+            if game_board[i][j] != ' ':
+                counters['backtracks'] += 1
+            insert(i, j, val)
+            numbers_tried[(i, j)].add(val)
+            counters['nodes'] += 1
+            counters['placements'] += 1
+            direction = 'f'
+        else:
+            numbers_tried[(i, j)] = set()
+            insert(i, j, ' ')
+            counters['backtracks'] += 1
+            direction = 'b'
+        i, j = move(i, j, direction)
+
+    return game_board if direction == 'f' else None
+
+def engine_solver(strategy, backend='search'):
+    """Return a benchmark solver for a strategy and backend of the engine."""
+    def engine_solve(board, counters, deadline=None):
+        timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+        stats = {}
+        try:
+            return solve(board, stats=stats, strategy=strategy, timeout=timeout,
+                         backend=backend)
+        finally:
+            counters['nodes'] += stats.get('nodes', 0)
+            counters['backtracks'] += stats.get('backtracks', 0)
+            counters['placements'] += (stats.get('nodes', 0) + stats.get('naked_singles', 0)
+                                       + stats.get('hidden_singles', 0))
+    return engine_solve
+
+STRATEGIES = {
+    'naive': naive_solve,
+    'three_board': three_board_solve,
+    'row': engine_solver('row'),
+    'mrv': engine_solver('mrv'),
+    'dlx': engine_solver('mrv', 'dlx'),
+    'flat': engine_solver('mrv', 'flat'),
+}
+
+
+def run_strategy(solver, boards, timeout=None, memory_sample=3):
+    """
+    Run a solver over the boards and return a dict of its results. Peak
+    memory is measured in a second pass over the first memory_sample
+    boards, since tracing allocations slows the solve down.
+
+    """
+    counters = {'nodes': 0, 'backtracks': 0, 'placements': 0}
+    solved = 0
+    timeouts = 0
+    failed = 0
+    start = time.perf_counter()
+    for board in boards:
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        try:
+            solution = solver(board, counters, deadline)
+        except SolveTimeout:
+            timeouts += 1
+            continue
+        if solution is not None and check_solution(solution):
+            solved += 1
+        else:
+            failed += 1
+    wall_time = time.perf_counter() - start
+
+    peak_memory = 0
+    if memory_sample:
+        tracemalloc.start()
+        try:
+            for board in boards[:memory_sample]:
+                tracemalloc.reset_peak()
+                deadline = None if timeout is None else time.perf_counter() + timeout
+                try:
+                    solver(board, {'nodes': 0, 'backtracks': 0, 'placements': 0}, deadline)
+                except SolveTimeout:
+                    pass
+                peak_memory = max(peak_memory, tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        'puzzles': len(boards),
+        'solved': solved,
+        'timeouts': timeouts,
+        'failed': failed,
+        'wall_time': wall_time,
+        'nodes': counters['nodes'],
+        'backtracks': counters['backtracks'],
+        'placements': counters['placements'],
+        'placements_per_second': counters['placements'] / wall_time if wall_time else 0.0,
+        'peak_memory': peak_memory,
+    }
+
+def count_allocations(func):
+    """
+    Call func with every opcode traced and return (blocks, objects):
+    the memory blocks allocated while it ran, and how many of them were
+    objects tracked by the garbage collector. An allocation is seen as
+    a rise in the allocated block count from one opcode to the next, so
+    a block that is freed by the same opcode that made it is missed.
+    Tracing makes a frame object for every Python call, and these are
+    taken off the counts.
+
+    """
+    # The block count, objects count, and totals as of the last event.
+    state = {'blocks': 0, 'objects': 0, 'new_blocks': 0, 'new_objects': 0, 'calls': 0}
+
+    def tracer(frame, event, arg):
+        blocks = sys.getallocatedblocks()
+        objects = gc.get_count()[0]
+        if blocks > state['blocks']:
+            state['new_blocks'] += blocks - state['blocks']
+        if objects > state['objects']:
+            state['new_objects'] += objects - state['objects']
+        if event == 'call':
+            state['calls'] += 1
+            frame.f_trace_opcodes = True
+        # Taken again without the locals, so the tracer's own ints do
+        # not count against the next opcode.
+        del blocks, objects
+        state['objects'] = gc.get_count()[0]
+        state['blocks'] = sys.getallocatedblocks()
+        return tracer
+
+    gc.collect()
+    gc.disable()
+    state['objects'] = gc.get_count()[0]
+    state['blocks'] = sys.getallocatedblocks()
+    sys.settrace(tracer)
+    try:
+        func()
+    finally:
+        sys.settrace(None)
+        gc.enable()
+    return (max(0, state['new_blocks'] - state['calls']),
+            max(0, state['new_objects'] - state['calls']))
+
+def search_phase(board, core):
+    """
+    Set up a solver of an engine core for the board and return its
+    search as a function of no arguments, so that the setup is left
+    out of the allocation count.
+
+    """
+    if core in ('row', 'mrv'):
+        solver = Solver(board, core)
+        if not solver.prepare():
+            return lambda: None
+        return solver.search
+    solver = make_solver(board, core)
+    return lambda: solver.search(1)
+
+def run_allocations(corpora, cores=ALLOCATION_CORES, sample=3, timeout=None):
+    """
+    Count the allocations per node of the search phase of every core
+    over the first sample boards of every corpus. A board that a core
+    cannot solve within the timeout untraced is left out for that core,
+    since tracing is far slower still. Returns the report as a dict.
+
+    """
+    results = {}
+    for corpus, path in corpora.items():
+        boards = list(read_puzzles(path))[:sample]
+        results[corpus] = {}
+        for core in cores:
+            nodes = blocks = objects = 0
+            measured = 0
+            for board in boards:
+                stats = {}
+                try:
+                    if core in ('row', 'mrv'):
+                        solve(board, stats=stats, strategy=core, timeout=timeout)
+                    else:
+                        solve(board, stats=stats, backend=core, timeout=timeout)
+                except SolveTimeout:
+                    continue
+                measured += 1
+                nodes += stats['nodes']
+                new_blocks, new_objects = count_allocations(search_phase(board, core))
+                blocks += new_blocks
+                objects += new_objects
+            results[corpus][core] = {
+                'puzzles': measured,
+                'nodes': nodes,
+                'blocks': blocks,
+                'objects': objects,
+                'blocks_per_node': blocks / nodes if nodes else 0.0,
+                'objects_per_node': objects / nodes if nodes else 0.0,
+            }
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+def time_import(module):
+    """
+    Import a module in a fresh interpreter and return the seconds the
+    import took and the list of the HEAVY_MODULES it loaded.
+
+    """
+    output = subprocess.run([sys.executable, '-c', IMPORT_SCRIPT, module, *HEAVY_MODULES],
+                            cwd=HERE, stdout=subprocess.PIPE, check=True,
+                            universal_newlines=True).stdout.split()
+    return float(output[0]), output[1:]
+
+def run_imports(modules=IMPORT_MODULES, repeat=IMPORT_REPEAT):
+    """
+    Time the import of every module, keeping the median of repeat
+    fresh interpreters after one more to warm the bytecode cache.
+    Returns the report as a dict.
+
+    """
+    results = {}
+    for module in modules:
+        time_import(module)
+        times = []
+        for _ in range(repeat):
+            elapsed, loaded = time_import(module)
+            times.append(elapsed)
+        results[module] = {
+            'import_time': statistics.median(times),
+            'loaded': loaded,
+        }
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+def run_benchmark(corpora, strategies, timeout=None, limit=None, memory_sample=3):
+    """
+    Run every strategy over every corpus, given as dicts of name to
+    path and name to solver. Returns the report as a dict.
+
+    """
+    results = {}
+    for corpus, path in corpora.items():
+        boards = list(read_puzzles(path))[:limit]
+        results[corpus] = {}
+        for name, solver in strategies.items():
+            if name in ONLY_9X9 and any(len(board) != 9 for board in boards):
+                continue
+            results[corpus][name] = run_strategy(solver, boards, timeout, memory_sample)
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timeout': timeout,
+        'results': results,
+    }
+
+def compare(report, baseline, tolerance=0.25):
+    """
+    Compare a report with a baseline report and return a list of the
+    regressions found: fewer puzzles solved, or wall time or nodes more
+    than tolerance above the baseline.
+
+    """
+    regressions = []
+    for corpus, strategies in report['results'].items():
+        for name, result in strategies.items():
+            base = baseline.get('results', {}).get(corpus, {}).get(name)
+            if base is None:
+                continue
+            label = '{}/{}'.format(corpus, name)
+            if result['solved'] < base['solved']:
+                regressions.append('{}: solved {} < {}'.format(
+                    label, result['solved'], base['solved']))
+            for key in ('wall_time', 'nodes'):
+                if key == 'wall_time' and result[key] < MIN_WALL_TIME:
+                    continue
+                if result[key] > base[key] * (1 + tolerance):
+                    regressions.append('{}: {} {:.4g} > {:.4g} (+{:.0%})'.format(
+                        label, key, result[key], base[key], tolerance))
+    return regressions
+
+def print_report(report):
+    """Print a table of the results of a report."""
+    print('{:<10} {:<12} {:>7} {:>9} {:>10} {:>10} {:>12} {:>10}'.format(
+        'corpus', 'strategy', 'solved', 'time (s)', 'nodes', 'backtracks',
+        'placements/s', 'peak KiB'))
+    for corpus, strategies in report['results'].items():
+        for name, result in strategies.items():
+            print('{:<10} {:<12} {:>3}/{:<3} {:>9.3f} {:>10} {:>10} {:>12.0f} {:>10.1f}'.format(
+                corpus, name, result['solved'], result['puzzles'], result['wall_time'],
+                result['nodes'], result['backtracks'], result['placements_per_second'],
+                result['peak_memory'] / 1024))
+
+def print_allocations(report):
+    """Print a table of the results of an allocation report."""
+    print('{:<10} {:<6} {:>7} {:>8} {:>12} {:>13}'.format(
+        'corpus', 'core', 'puzzles', 'nodes', 'blocks/node', 'objects/node'))
+    for corpus, cores in report['results'].items():
+        for core, result in cores.items():
+            print('{:<10} {:<6} {:>7} {:>8} {:>12.1f} {:>13.2f}'.format(
+                corpus, core, result['puzzles'], result['nodes'], result['blocks_per_node'],
+                result['objects_per_node']))
+
+def print_imports(report):
+    """Print a table of the results of an import report."""
+    print('{:<14} {:>10}  {}'.format('module', 'time (ms)', 'loaded'))
+    for module, result in report['results'].items():
+        print('{:<14} {:>10.2f}  {}'.format(module, result['import_time'] * 1000,
+                                          ', '.join(result['loaded']) or '-'))
+
+def main():
+    """Run the benchmark and optionally check it against a baseline."""
+    parser = argparse.ArgumentParser(description='Benchmark the Sudoku solving algorithms.')
+    parser.add_argument('--corpus', action='append', default=None, metavar='NAME=PATH',
+                        help='corpus to run (default: {})'.format(', '.join(CORPORA)))
+    parser.add_argument('--strategies', nargs='+', choices=list(STRATEGIES),
+                        default=list(STRATEGIES), help='strategies to run (default: all)')
+    parser.add_argument('--timeout', type=float, default=5.0,
+                        help='seconds allowed for each puzzle (default: 5)')
+    parser.add_argument('--limit', type=int, default=None,
+                        help='only run the first N puzzles of each corpus')
+    parser.add_argument('--memory-sample', type=int, default=3,
+                        help='puzzles per corpus to measure peak memory on (default: 3)')
+    parser.add_argument('--allocations', action='store_true',
+                        help='count the allocations per node of each engine core instead')
+    parser.add_argument('--allocation-sample', type=int, default=3,
+                        help='puzzles per corpus to count allocations on with --allocations '
+                             '(default: 3)')
+    parser.add_argument('--imports', action='store_true',
+                        help='time the import of the core modules and GUI entry points instead')
+    parser.add_argument('--output', default=None, help='write the report as JSON to this file')
+    parser.add_argument('--baseline', default=None,
+                        help='baseline JSON report to check for regressions')
+    parser.add_argument('--save-baseline', default=None,
+                        help='write the report as the new baseline to this file')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed slowdown against the baseline (default: 0.25)')
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpora = {}
+        for item in args.corpus:
+            name, _, path = item.partition('=')
+            if not path:
+                name, path = os.path.splitext(os.path.basename(item))[0], item
+            corpora[name] = path
+    else:
+        corpora = CORPORA
+    strategies = {name: STRATEGIES[name] for name in args.strategies}
+
+    if args.imports:
+        report = run_imports()
+        print_imports(report)
+        if args.output:
+            with open(args.output, 'w') as f_out:
+                json.dump(report, f_out, indent=2)
+        return
+
+    if args.allocations:
+        cores = [name for name in args.strategies if name in ALLOCATION_CORES]
+        report = run_allocations(corpora, cores, args.allocation_sample, args.timeout)
+        print_allocations(report)
+        if args.output:
+            with open(args.output, 'w') as f_out:
+                json.dump(report, f_out, indent=2)
+        return
+
+    report = run_benchmark(corpora, strategies, args.timeout, args.limit, args.memory_sample)
+    print_report(report)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w') as f_out:
+                json.dump(report, f_out, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, 'r') as f_in:
+            baseline = json.load(f_in)
+        regressions = compare(report, baseline, args.tolerance)
+        for regression in regressions:
+            print('REGRESSION ' + regression)
+        if regressions:
+            sys.exit(1)
+        print('No regressions against {}'.format(args.baseline))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,349 @@
+"""
+The wx frame shared by the GUIs of main.py and fast_main.py: the board,
+the controls, entering numbers with conflict and solvability checks,
+hints, and the animation of a solve on a background thread. The
+frames in naive_frame.py and fast_frame.py add their solvers.
+
+"""
+import threading
+
+import wx
+
+from animation import FRAME_RATE, CellFeed
+from hint import describe, play_state_for
+from play import CHECK_DELAY, VERDICT_LABELS, PlayState
+from puzzle_store import random_puzzle
+from sudoku import geometry_for
+
+
+# The most number buttons shown in one row under the board.
+MAX_CONTROL_COLUMNS = 17
+
+
+class BoardFrame(wx.Frame):
+    """
+    The board, the number buttons, and the solve and hint controls. A
+    subclass supplies the solver through on_solve(), which hands the
+    work to start_solve(), and shows the result with finish_solve().
+
+    """
+    def __init__(self, frame_rate=FRAME_RATE, path='puzzles.txt'):
+        super().__init__(parent=None, title='Sudoku', size=(485,515))
+        self.highlighted_button = None
+        self.frame_rate = frame_rate
+        self.feed = None
+        self.solver_thread = None
+        # Bumped on every entry so that stale solvability checks are
+        # ignored.
+        self.check_generation = 0
+        self.check_call = None
+        # The cells highlighted by the last hint.
+        self.hint_cells = []
+
+        # Initialize a game board.
+        index, board = random_puzzle(path)
+        print('Playing Game #{}'.format(index))
+        self.board = board
+        self.geometry = geo = geometry_for(board)
+        size = self.NUM_GRID_ROWS = self.NUM_GRID_COLS = geo.size
+        box = geo.box
+
+        self.panel = wx.Panel(self)
+
+        self.master_sizer = wx.BoxSizer(wx.VERTICAL)
+
+        self.main_grid = wx.GridBagSizer(2, 2)
+        self.master_sizer.Add(self.main_grid, 0, wx.ALL|wx.EXPAND, 5)
+
+        self.button_list = []
+        row_offset = 0
+        for i in range(self.NUM_GRID_ROWS):
+            self.button_list.append([])
+            col_offset = 0
+            for j in range(self.NUM_GRID_COLS):
+                button = wx.Button(self.panel, id=i*size + j, label=str(board[i][j]), style=wx.BU_EXACTFIT)
+                button.Bind(wx.EVT_BUTTON, self.on_grid_click)
+                self.main_grid.Add(button, pos=(i+row_offset, j+col_offset), flag=wx.ALL|wx.EXPAND, border=0)
+                self.button_list[i].append(button)
+                # Add separators to make it look more like a sudoku
+                # board.
+                if j % box == box - 1 and j != size - 1:
+                    col_offset += 1
+                    if i % box == 0:
+                        self.main_grid.Add(wx.StaticLine(self.panel, style=wx.LI_VERTICAL),
+                                           pos=(i+row_offset, j+col_offset),
+                                           span=(box, 0))
+
+                if i % box == box - 1 and j == size - 1:
+                    row_offset += 1
+                    self.main_grid.Add(wx.StaticLine(self.panel, style=wx.LI_HORIZONTAL),
+                                       pos=(i+row_offset, j+col_offset),
+                                       span=(0, size + box - 1))
+
+        # Add a separator between the Sudoku grid and the controls.
+        grid_control_separator = wx.StaticLine(self.panel, style=wx.LI_HORIZONTAL)
+        self.master_sizer.Add(grid_control_separator, 0, wx.ALL|wx.EXPAND, 5)
+
+        # Add the controls grid (rows of buttons). Their ids follow the
+        # ids of the grid cells.
+        self.control_labels = list(geo.digits[1:]) + [' ']
+        columns = len(self.control_labels)
+        if columns > MAX_CONTROL_COLUMNS:
+            columns = (columns + 1) // 2
+        self.selection_button_grid = wx.GridSizer(columns, 1, 0)
+        self.master_sizer.Add(self.selection_button_grid, 0, wx.ALL|wx.EXPAND, 0)
+
+        self.selection_button_list = []
+        for i, label in enumerate(self.control_labels):
+            button = wx.Button(self.panel, id=geo.num_cells + i, label=label,
+                               style=wx.BU_EXACTFIT)
+            button.Bind(wx.EVT_BUTTON, self.select_number)
+            self.selection_button_grid.Add(button, 0, wx.ALL|wx.EXPAND, 5)
+            self.selection_button_list.append(button)
+
+        # Add the 'Solve' button and the animation controls.
+        self.solve_sizer = wx.BoxSizer(wx.HORIZONTAL)
+        self.master_sizer.Add(self.solve_sizer, 0, wx.ALL|wx.CENTER, 5)
+
+        self.solve_button = wx.Button(self.panel, label='Solve!')
+        self.solve_button.Bind(wx.EVT_BUTTON, self.on_solve)
+        self.solve_sizer.Add(self.solve_button, 0, wx.ALL|wx.CENTER, 5)
+
+        self.skip_box = wx.CheckBox(self.panel, label='Skip animation')
+        self.skip_box.Bind(wx.EVT_CHECKBOX, self.on_skip)
+        self.solve_sizer.Add(self.skip_box, 0, wx.ALL|wx.CENTER, 5)
+
+        self.step_box = wx.CheckBox(self.panel, label='Step mode')
+        self.step_box.Bind(wx.EVT_CHECKBOX, self.on_step_mode)
+        self.solve_sizer.Add(self.step_box, 0, wx.ALL|wx.CENTER, 5)
+
+        self.step_button = wx.Button(self.panel, label='Step')
+        self.step_button.Bind(wx.EVT_BUTTON, self.on_step)
+        self.solve_sizer.Add(self.step_button, 0, wx.ALL|wx.CENTER, 5)
+
+        # Hints come from the logical techniques, which need a 9x9 board.
+        self.hint_button = wx.Button(self.panel, label='Hint')
+        self.hint_button.Bind(wx.EVT_BUTTON, self.on_hint)
+        self.hint_button.Enable(size == 9)
+        self.solve_sizer.Add(self.hint_button, 0, wx.ALL|wx.CENTER, 5)
+
+        # Keep the player's entries checked as they are made.
+        self.play_state = play_state_for(board)
+        self.status_text = wx.StaticText(self.panel, label='')
+        self.master_sizer.Add(self.status_text, 0, wx.ALL|wx.CENTER, 5)
+
+        # Redraw the solver's progress at a fixed frame rate.
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self.on_timer, self.timer)
+        self.Bind(wx.EVT_CLOSE, self.on_close)
+
+        self.panel.SetSizer(self.master_sizer)
+        if size != 9:
+            self.master_sizer.Fit(self)
+
+        self.Show()
+
+    def select_number(self, event):
+        """
+        Update the highlighted grid cell based on the control button that
+        was clicked.
+
+        """
+        self.clear_hint()
+        if self.highlighted_button is not None:
+            self.highlighted_button.SetLabel(
+                self.control_labels[event.Id - self.geometry.num_cells])
+
+            # Only the cells whose conflict status changed are redrawn.
+            index = self.highlighted_button.GetId()
+            changed = self.play_state.set_cell(index // self.NUM_GRID_COLS,
+                                               index % self.NUM_GRID_COLS,
+                                               self.highlighted_button.GetLabel())
+            for cell in changed:
+                self.show_conflict(cell)
+            self.schedule_check()
+
+    def show_conflict(self, index):
+        """Color the number in the cell red if it conflicts with a peer."""
+        button = self.button_list[index // self.NUM_GRID_COLS][index % self.NUM_GRID_COLS]
+        if index in self.play_state.conflicts:
+            button.SetForegroundColour(wx.Colour(200, 0, 0))
+        else:
+            button.SetForegroundColour(wx.NullColour)
+
+    def schedule_check(self):
+        """
+        Check whether the board can still be solved once the player
+        pauses. Each entry restarts the wait, so quick typing only
+        triggers one check.
+
+        """
+        self.check_generation += 1
+        if self.play_state.conflicts:
+            if self.check_call is not None:
+                self.check_call.Stop()
+            self.status_text.SetLabel('Conflicting entries')
+            return
+        self.status_text.SetLabel('Checking...')
+        if self.check_call is not None and self.check_call.IsRunning():
+            self.check_call.Restart(CHECK_DELAY)
+        else:
+            self.check_call = wx.CallLater(CHECK_DELAY, self.start_check)
+
+    def start_check(self):
+        """Run the solvability check on a background thread."""
+        state = PlayState(self.play_state.game_board)
+        threading.Thread(target=self.run_check, args=(state, self.check_generation),
+                         daemon=True).start()
+
+    def run_check(self, state, generation):
+        """Find the verdict. This is called on the background thread."""
+        wx.CallAfter(self.show_verdict, generation, state.verdict())
+
+    def show_verdict(self, generation, verdict):
+        """Show the verdict unless the board has changed since the check."""
+        if generation != self.check_generation:
+            return
+        self.status_text.SetLabel(VERDICT_LABELS[verdict])
+
+    def on_grid_click(self, event):
+        """Highlight/unhighlight the grid cell that was clicked."""
+        self.clear_hint()
+        button = self.button_list[event.Id // self.NUM_GRID_COLS][event.Id % self.NUM_GRID_COLS]
+        if self.highlighted_button is None:
+            self.highlighted_button = button
+            self.highlighted_button.SetBackgroundColour(wx.Colour(0, 130, 0))
+        elif self.highlighted_button is button:
+            self.highlighted_button.SetBackgroundColour(wx.NullColour)
+            self.highlighted_button = None
+        else:
+            self.highlighted_button.SetBackgroundColour(wx.NullColour)
+            self.highlighted_button = button
+            self.highlighted_button.SetBackgroundColour(wx.Colour(0, 130, 0))
+
+    def on_hint(self, event):
+        """
+        Highlight the cells of the next logical deduction from the board
+        as it stands: the cells of its pattern in yellow, and the cells
+        it fills or removes numbers from in blue.
+
+        """
+        if self.solving():
+            return
+        self.clear_hint()
+        deduction = self.play_state.hint()
+        if deduction is None:
+            if self.play_state.conflicts:
+                self.status_text.SetLabel('Conflicting entries')
+            else:
+                self.status_text.SetLabel('No logical step from here')
+            return
+
+        targets = [index for index, _ in deduction.placements + deduction.eliminations]
+        self.hint_cells = list(deduction.cells) + targets
+        for index in self.hint_cells:
+            button = self.button_list[index // self.NUM_GRID_COLS][index % self.NUM_GRID_COLS]
+            if index in targets:
+                button.SetBackgroundColour(wx.Colour(100, 160, 230))
+            else:
+                button.SetBackgroundColour(wx.Colour(230, 200, 0))
+        self.status_text.SetLabel(describe(deduction))
+
+    def clear_hint(self):
+        """Remove the highlighting of the last hint."""
+        for index in self.hint_cells:
+            button = self.button_list[index // self.NUM_GRID_COLS][index % self.NUM_GRID_COLS]
+            if button is self.highlighted_button:
+                button.SetBackgroundColour(wx.Colour(0, 130, 0))
+            else:
+                button.SetBackgroundColour(wx.NullColour)
+        self.hint_cells = []
+
+    def solving(self):
+        """Return True while a solve is running on the background thread."""
+        return self.solver_thread is not None and self.solver_thread.is_alive()
+
+    def on_solve(self, event):
+        """Solve the board. Subclasses start their solver from here."""
+        raise NotImplementedError
+
+    def start_solve(self, run, *args):
+        """
+        Start run(*args, feed) on a background thread, with a new feed
+        whose changes the timer draws.
+
+        """
+        self.feed = CellFeed(skip=self.skip_box.GetValue(), stepping=self.step_box.GetValue())
+        self.solver_thread = threading.Thread(target=run, args=args + (self.feed,),
+                                              daemon=True)
+        self.solve_button.Disable()
+        self.timer.Start(max(1, int(1000 / self.frame_rate)))
+        self.solver_thread.start()
+
+    def finish_solve(self, board):
+        """
+        Stop the animation once the background solve has finished and
+        show the board it ended with, or leave the cells as they are if
+        board is None.
+
+        """
+        self.timer.Stop()
+        self.feed.drain()
+        self.solve_button.Enable()
+        for i, row in enumerate(self.button_list):
+            for j, button in enumerate(row):
+                if board is not None:
+                    button.SetLabel(board[i][j])
+                button.SetBackgroundColour(wx.NullColour)
+        self.reset_play_state()
+
+    def reset_play_state(self):
+        """Start checking entries against the board now shown."""
+        self.check_generation += 1
+        board = [[button.GetLabel() for button in row] for row in self.button_list]
+        self.play_state = play_state_for(board)
+        for index in range(self.geometry.num_cells):
+            self.show_conflict(index)
+        self.status_text.SetLabel('')
+
+    def on_timer(self, event):
+        """Draw the cell changes the solver made since the last frame."""
+        if self.feed is not None:
+            for (i, j), num in self.feed.drain().items():
+                self.update_cell(i, j, num)
+
+    def on_skip(self, event):
+        """Turn the animation of a running solve off or on."""
+        if self.skip_box.GetValue():
+            self.step_box.SetValue(False)
+        if self.feed is not None:
+            self.feed.set_skip(self.skip_box.GetValue())
+
+    def on_step_mode(self, event):
+        """Turn step mode of a running solve on or off."""
+        if self.feed is not None:
+            self.feed.set_stepping(self.step_box.GetValue())
+
+    def on_step(self, event):
+        """Let the solver make its next change in step mode."""
+        if self.feed is not None:
+            self.feed.step()
+
+    def on_close(self, event):
+        """Free a solver that is waiting in step mode before closing."""
+        self.timer.Stop()
+        if self.feed is not None:
+            self.feed.close()
+        event.Skip()
+
+    def update_cell(self, i, j, num):
+        """
+        Update the number in the cell and the color of the cell as the
+        algorithm progresses.
+
+        """
+        self.button_list[i][j].SetLabel(str(num))
+        if str(num) == ' ':
+            self.button_list[i][j].SetBackgroundColour(wx.Colour(130, 0, 0))
+        else:
+            self.button_list[i][j].SetBackgroundColour(wx.Colour(0, 130, 0))
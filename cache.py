@@ -0,0 +1,246 @@
+"""
+A solution cache that recognizes puzzles it has seen before, even when
+they come back relabeled, with rows or columns shuffled within their
+bands and stacks, with bands or stacks shuffled, or transposed.
+
+Each puzzle is brought into a canonical form by ordering its bands,
+rows, stacks, and columns by keys built from their clue counts (see
+line_keys()), transposing if that gives a smaller form, and
+renumbering the digits in order of first appearance. Orderings that
+the keys leave tied are tried too, up to a limit, and the smallest
+form wins. The solution is stored under the canonical form and mapped
+back to the caller's orientation on a hit. A tie that is cut off by
+the limit can only cost a cache miss, never a wrong solution, since
+every stored form is an exact transformation of its puzzle.
+
+"""
+import os
+from collections import OrderedDict
+from itertools import islice, permutations, product
+
+from sudoku import solve
+
+
+# The most row orderings and column orderings tried per orientation.
+MAX_ORDERINGS = 4
+
+
+def line_keys(grid):
+    """
+    Return a key for each row and each column of a flat grid that does
+    not change under any of the symmetries: its clue count, the sorted
+    clue counts of its three subgrids, and the sorted clue counts of
+    the crossing lines and the digits at its clues.
+
+    """
+    row_counts = [sum(1 for j in range(9) if grid[i*9 + j]) for i in range(9)]
+    col_counts = [sum(1 for i in range(9) if grid[i*9 + j]) for j in range(9)]
+    digit_counts = [0] * 10
+    for val in grid:
+        digit_counts[val] += 1
+
+    def key(line, crossing_counts):
+        clues = [(k, val) for k, val in enumerate(line) if val]
+        return (len(clues),
+                tuple(sorted(sum(1 for val in line[k:k + 3] if val) for k in (0, 3, 6))),
+                tuple(sorted(crossing_counts[k] for k, _ in clues)),
+                tuple(sorted(digit_counts[val] for _, val in clues)))
+
+    row_keys = [key(grid[i*9:i*9 + 9], col_counts) for i in range(9)]
+    col_keys = [key(grid[j::9], row_counts) for j in range(9)]
+    return row_keys, col_keys
+
+def tied_orderings(keys, limit=MAX_ORDERINGS):
+    """
+    Return up to limit orderings of the 9 rows (or columns) described by
+    their keys: bands by their sorted row keys, and rows by key within
+    each band. Every ordering of tied rows and tied bands is a
+    candidate.
+
+    """
+    bands = []
+    for band in range(3):
+        rows = range(band*3, band*3 + 3)
+        groups = {}
+        for row in rows:
+            groups.setdefault(keys[row], []).append(row)
+        # Every way to order the rows of this band, tied rows included.
+        choices = [list(permutations(groups[key])) for key in sorted(groups, reverse=True)]
+        orders = [sum(choice, ()) for choice in islice(product(*choices), limit)]
+        band_key = tuple(sorted((keys[row] for row in rows), reverse=True))
+        bands.append((band_key, orders))
+
+    band_groups = {}
+    for band_key, orders in bands:
+        band_groups.setdefault(band_key, []).append(orders)
+    band_choices = [list(permutations(band_groups[key]))
+                    for key in sorted(band_groups, reverse=True)]
+
+    orderings = []
+    for band_order in product(*band_choices):
+        band_order = sum(band_order, ())
+        for rows in product(*band_order):
+            orderings.append(sum(rows, ()))
+            if len(orderings) >= limit:
+                return orderings
+    return orderings
+
+def canonical_form(board):
+    """
+    Return (key, transform) for the board. The key is an 81-character
+    string of the canonical puzzle, and the transform is what
+    from_canonical() needs to map a canonical solution back.
+
+    """
+    cells = [0 if val == ' ' else int(val) for row in board for val in row]
+    best = None
+    for transposed in (False, True):
+        if transposed:
+            grid = [cells[j*9 + i] for i in range(9) for j in range(9)]
+        else:
+            grid = cells
+        row_keys, col_keys = line_keys(grid)
+        for rows in tied_orderings(row_keys):
+            for cols in tied_orderings(col_keys):
+                labels = {0: 0}
+                key = []
+                for i in rows:
+                    for j in cols:
+                        val = grid[i*9 + j]
+                        if val not in labels:
+                            labels[val] = len(labels)
+                        key.append(labels[val])
+                if best is None or key < best[0]:
+                    best = (key, (transposed, rows, cols, labels))
+
+    key, transform = best
+    return ''.join(map(str, key)), transform
+
+def from_canonical(solution, transform):
+    """Map a canonical 81-character solution back onto the original board."""
+    transposed, rows, cols, labels = transform
+    # Digits missing from the puzzle take the remaining labels in order.
+    unlabel = {label: val for val, label in labels.items()}
+    missing = [val for val in range(1, 10) if val not in labels]
+    for label in range(len(labels), 10):
+        unlabel[label] = missing[label - len(labels)]
+
+    grid = [0] * 81
+    for r, i in enumerate(rows):
+        for c, j in enumerate(cols):
+            grid[i*9 + j] = unlabel[int(solution[r*9 + c])]
+    if transposed:
+        grid = [grid[j*9 + i] for i in range(9) for j in range(9)]
+    return [[str(grid[i*9 + j]) for j in range(9)] for i in range(9)]
+
+def to_canonical(solution, transform):
+    """Map a solution of the original board into canonical form."""
+    transposed, rows, cols, labels = transform
+    labels = dict(labels)
+    missing = [val for val in range(1, 10) if val not in labels]
+    for val in missing:
+        labels[val] = len(labels)
+
+    grid = [int(val) for row in solution for val in row]
+    if transposed:
+        grid = [grid[j*9 + i] for i in range(9) for j in range(9)]
+    return ''.join(str(labels[grid[i*9 + j]]) for i in rows for j in cols)
+
+
+class SolutionCache():
+    """
+    An LRU cache of solutions keyed by canonical puzzle form, holding at
+    most capacity entries. Puzzles with no solution are remembered too.
+    If a path is given, the cache is loaded from it on creation and
+    written back by save().
+
+    """
+    def __init__(self, capacity=100000, path=None):
+        self.capacity = capacity
+        self.path = path
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, board):
+        """
+        Return (found, solution) for the board. The solution is None for
+        a puzzle that is known to have no solution.
+
+        """
+        key, transform = canonical_form(board)
+        if key not in self.entries:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        solution = self.entries[key]
+        if not solution:
+            return True, None
+        return True, from_canonical(solution, transform)
+
+    def put(self, board, solution):
+        """Remember the solution of the board, or None if it has none."""
+        key, transform = canonical_form(board)
+        self.store(key, to_canonical(solution, transform) if solution else '')
+
+    def store(self, key, value):
+        """Add a canonical entry, evicting the least recently used one."""
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def solve(self, board, **options):
+        """
+        Solve the board through the cache. See sudoku.solve(). Only 9x9
+        boards are cached; other sizes are passed straight through.
+
+        """
+        if len(board) != 9:
+            return solve(board, **options)
+        key, transform = canonical_form(board)
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            solution = self.entries[key]
+            return from_canonical(solution, transform) if solution else None
+
+        self.misses += 1
+        solution = solve(board, **options)
+        self.store(key, to_canonical(solution, transform) if solution else '')
+        return solution
+
+    def hit_rate(self):
+        """Return the fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def load(self, path):
+        """Add the entries saved in the file, oldest first."""
+        with open(path, 'r') as f_in:
+            for line in f_in:
+                key, _, solution = line.strip().partition(',')
+                if len(key) == 81 and len(solution) in (0, 81):
+                    self.store(key, solution)
+
+    def save(self, path=None):
+        """
+        Write the entries to the file, oldest first. The path defaults
+        to the one the cache was made with; ValueError is raised if
+        there is neither.
+
+        """
+        path = path or self.path
+        if path is None:
+            raise ValueError('SolutionCache.save() needs a path')
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f_out:
+            for key, solution in self.entries.items():
+                f_out.write('{},{}\n'.format(key, solution))
+        os.replace(tmp_path, path)
@@ -0,0 +1,2 @@
+# Puts this directory on sys.path, so the tests in tests/ can import the
+# top-level modules however pytest is started.
@@ -0,0 +1,263 @@
+"""
+An exact cover backend for the engine, using Knuth's Dancing Links.
+
+Sudoku is the exact cover problem of choosing one (cell, number) row
+per constraint column, with four kinds of columns: every cell holds a
+number, and every row, column, and subgrid holds every number once.
+That is 324 columns on a 9x9 board. Only the columns that the givens
+leave open are built, and only the rows for numbers that the givens
+still allow, so the matrix starts as small as possible. The search
+always branches on the column with the fewest rows left, which makes
+it immune to puzzles built to defeat a fixed cell order.
+
+The matrix is kept in flat lists of node links, and the search is a
+loop with an explicit stack, so boards up to 25x25 need no recursion.
+
+"""
+import time
+
+from sudoku import NodeLimit, SolveTimeout, check_violations, geometry_for
+
+
+# Search steps between checks of the deadline.
+DEADLINE_INTERVAL = 1024
+
+
+class DancingLinks():
+    """
+    The exact cover matrix of one board. Node 0 is the root, nodes 1 to
+    the number of columns are the column headers, and the rest are the
+    1s of the matrix, four per (cell, number) row. Every node has left,
+    right, up, and down links and the column it is in, and each column
+    header keeps the number of rows left in it.
+
+    """
+    def __init__(self, board, timeout=None, instrument=None, max_nodes=None):
+        self.board = board
+        self.timeout = timeout
+        self.instrument = instrument
+        # The rows selected so far, and how many may be selected before
+        # NodeLimit is raised.
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.geometry = geo = geometry_for(board)
+        self.solution = None
+        self.found = 0
+
+        size = geo.size
+        self.cells = cells = [geo.values[val] for row in board for val in row]
+        self.valid = check_violations(board)
+
+        # The constraint columns the givens leave open, in order.
+        used = set()
+        for index, num in enumerate(cells):
+            if num:
+                used.update(self.constraints(index, num))
+        open_columns = [key for key in range(4 * geo.num_cells) if key not in used]
+        column_of_key = {key: k + 1 for k, key in enumerate(open_columns)}
+        num_columns = len(open_columns)
+
+        nodes = num_columns + 1
+        self.left = left = list(range(-1, nodes - 1))
+        self.right = right = list(range(1, nodes + 1))
+        left[0] = num_columns
+        right[num_columns] = 0
+        self.up = up = list(range(nodes))
+        self.down = down = list(range(nodes))
+        self.column = column = list(range(nodes))
+        self.sizes = sizes = [0] * nodes
+        # The (index, num) of the matrix row of each node.
+        self.row_of = row_of = [None] * nodes
+
+        for index, given in enumerate(cells):
+            if given:
+                continue
+            for num in range(1, size + 1):
+                keys = self.constraints(index, num)
+                if any(key in used for key in keys):
+                    continue
+                first = len(column)
+                for k, key in enumerate(keys):
+                    col = column_of_key[key]
+                    node = first + k
+                    # Append the node at the bottom of its column.
+                    up.append(up[col])
+                    down.append(col)
+                    down[up[col]] = node
+                    up[col] = node
+                    left.append(first + (k - 1) % 4)
+                    right.append(first + (k + 1) % 4)
+                    column.append(col)
+                    row_of.append((index, num))
+                    sizes[col] += 1
+
+    def constraints(self, index, num):
+        """Return the four constraint column keys of a (cell, number) row."""
+        geo = self.geometry
+        size = geo.size
+        cells = geo.num_cells
+        digit = num - 1
+        return (index,
+                cells + geo.row_of[index]*size + digit,
+                2*cells + geo.col_of[index]*size + digit,
+                3*cells + geo.box_of[index]*size + digit)
+
+    def cover(self, col):
+        """Remove a column and every row that has a 1 in it."""
+        left, right, up, down, column, sizes = (self.left, self.right, self.up, self.down,
+                                                self.column, self.sizes)
+        left[right[col]] = left[col]
+        right[left[col]] = right[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                sizes[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, col):
+        """Put back a column removed by cover(), in reverse order."""
+        left, right, up, down, column, sizes = (self.left, self.right, self.up, self.down,
+                                                self.column, self.sizes)
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                sizes[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        left[right[col]] = col
+        right[left[col]] = col
+
+    def choose_column(self):
+        """Return the open column with the fewest rows left."""
+        right, sizes = self.right, self.sizes
+        best = right[0]
+        col = right[best]
+        while col:
+            if sizes[col] < sizes[best]:
+                best = col
+                if sizes[best] <= 1:
+                    break
+            col = right[col]
+        return best
+
+    def select(self, node):
+        """Take the row of a node into the cover, covering its other columns."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise NodeLimit()
+        right, column = self.right, self.column
+        j = right[node]
+        while j != node:
+            self.cover(column[j])
+            j = right[j]
+        instrument = self.instrument
+        if instrument is not None:
+            instrument.nodes += 1
+            instrument.emit('place', *self.row_of[node])
+
+    def deselect(self, node):
+        """Take the row of a node back out of the cover."""
+        left, column = self.left, self.column
+        j = left[node]
+        while j != node:
+            self.uncover(column[j])
+            j = left[j]
+        instrument = self.instrument
+        if instrument is not None:
+            instrument.backtracks += 1
+            instrument.emit('remove', self.row_of[node][0], 0)
+
+    def search(self, limit):
+        """
+        Find covers until limit of them have been found or there are no
+        more, keeping the first as self.solution. Returns the count.
+
+        """
+        self.solution = None
+        self.found = 0
+        if not self.valid:
+            return 0
+        instrument = self.instrument
+        if instrument is not None:
+            instrument.geometry = self.geometry
+        deadline = None if self.timeout is None else time.perf_counter() + self.timeout
+        right, down, column, sizes = self.right, self.down, self.column, self.sizes
+
+        # The rows chosen so far, one per level of the search.
+        stack = []
+        backtracking = False
+        steps = 0
+        start = time.perf_counter()
+        while True:
+            steps += 1
+            if deadline is not None and not steps % DEADLINE_INTERVAL:
+                if time.perf_counter() > deadline:
+                    raise SolveTimeout()
+
+            if not backtracking:
+                if not right[0]:
+                    # Every column is covered: the stack is a solution.
+                    self.found += 1
+                    if self.solution is None:
+                        self.solution = self.board_from(stack)
+                    if self.found >= limit:
+                        break
+                    backtracking = True
+                    continue
+                col = self.choose_column()
+                if not sizes[col]:
+                    backtracking = True
+                    continue
+                self.cover(col)
+                node = down[col]
+                stack.append(node)
+                self.select(node)
+                if instrument is not None and len(stack) > instrument.max_depth:
+                    instrument.max_depth = len(stack)
+                continue
+
+            # Move the deepest choice on to its next row, or give it up.
+            if not stack:
+                break
+            node = stack.pop()
+            self.deselect(node)
+            col = column[node]
+            node = down[node]
+            if node == col:
+                self.uncover(col)
+                continue
+            stack.append(node)
+            self.select(node)
+            backtracking = False
+
+        if instrument is not None:
+            instrument.search_time += time.perf_counter() - start
+        return self.found
+
+    def board_from(self, stack):
+        """Return the board with the rows of the stack filled in."""
+        geo = self.geometry
+        cells = list(self.cells)
+        for node in stack:
+            index, num = self.row_of[node]
+            cells[index] = num
+        return [[geo.digits[cells[i*geo.size + j]] for j in range(geo.size)]
+                for i in range(geo.size)]
+
+    def solve(self):
+        """Return the solution of the board, or None."""
+        self.search(1)
+        return self.solution
+
+    def count(self, limit=2):
+        """Count the solutions of the board, stopping at limit."""
+        if limit < 1:
+            return 0
+        return self.search(limit)
@@ -0,0 +1,44 @@
+"""
+The wx front-end of fast_main.py: the board frame of board_frame.py with
+the animated solve by the engine of sudoku.py.
+
+"""
+import wx
+
+from animation import FRAME_RATE
+from board_frame import BoardFrame
+from sudoku import check_solution, default_strategy, solve
+
+
+class MyFrame(BoardFrame):
+    """The board frame, solved by the engine."""
+    def __init__(self, frame_rate=FRAME_RATE, path='puzzles.txt'):
+        super().__init__(frame_rate, path)
+        # Row-major search is hopeless on the larger boards.
+        self.strategy = default_strategy(self.board)
+
+    def on_solve(self, event):
+        """
+        Solve the Sudoku based on the original values given. The solve
+        runs in the headless engine on a background thread, and the GUI
+        only watches it through the feed.
+
+        """
+        if self.solving():
+            return
+        self.start_solve(self.run_solve, [row[:] for row in self.board])
+
+    def run_solve(self, board, feed):
+        """Run the solver. This is called on the background thread."""
+        solution = solve(board, observer=feed.push, strategy=self.strategy)
+        wx.CallAfter(self.on_solve_done, solution)
+
+    def on_solve_done(self, solution):
+        """Show the final board once the background solve has finished."""
+        self.finish_solve(solution)
+        if solution is None:
+            print("No solution!")
+        else:
+            print("Win!")
+            if check_solution(solution):
+                print("Solution is valid!")
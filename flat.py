@@ -0,0 +1,567 @@
+"""
+A search core for the engine that allocates all of its state up front.
+
+The Solver of sudoku.py builds a work queue, a set of units, and a
+closure for every propagation, and its mrv search recurses once per
+choice. This core keeps the whole state of a solve in flat lists that
+are allocated once, when the solver is made:
+
+- the cell values
+- for every cell, how many of its peers hold each number, and how
+  many numbers are still valid for it
+- for every row, column, and subgrid, whether it holds each number,
+  and in how many of its empty cells each number is still valid
+- a trail of the cells filled since the start of the search, one slot
+  per cell, with its length as the only pointer
+- the search stack of chosen cells, the next number to try for each,
+  and the trail length before each choice, one slot per depth
+- a ring buffer of cells to check for naked singles, and a ring
+  buffer of units to check for hidden singles, each with a flag per
+  entry so that nothing is queued twice
+
+Every placement brings the counts up to date, and undoing it takes
+them back, so a naked single is a cell with one valid number and a
+hidden single a number with one place in a unit, and both are read
+from the counts instead of worked out from candidate masks.
+Backtracking pops the trail back to the length saved for the choice.
+
+The peers and unit cells are read from tables with while loops, so
+the search loop makes no lists, sets, tuples, iterators, or closures.
+Every int it computes is a count, a number, or an index below the
+number of cells, and CPython keeps one shared object for each int up
+to 256, so on boards up to 16x16 the search allocates nothing but the
+solution it returns (bench.py --allocations counts the memory blocks).
+Only the cell indexes of a 25x25 board go past 256.
+
+Usage: solve(board, backend='flat') or count_solutions(board,
+backend='flat') in sudoku.py.
+
+"""
+import time
+
+from sudoku import NodeLimit, SolveTimeout, check_violations, geometry_for
+
+
+# Search steps between checks of the deadline. CPython keeps one shared
+# object for each int up to 256, so a counter that stays in that range
+# is never allocated.
+DEADLINE_INTERVAL = 256
+
+
+class Tables():
+    """The geometry of a board size as flat lists, built once per size."""
+    def __init__(self, geo):
+        size = geo.size
+        # One list per cell or unit, so that the loops over them count
+        # from 0 and never reach an int that has to be allocated.
+        self.peers = [list(peers) for peers in geo.peers]
+        self.peer_count = len(geo.peers[0])
+        self.unit_cells = [list(unit) for unit in geo.units]
+        # The units of each cell, and the units of each cell and its
+        # peers, which are the units whose counts a placement changes.
+        self.cell_units = [list(units) for units in geo.units_of]
+        self.touched_units = []
+        for index, peers in enumerate(geo.peers):
+            units = set(geo.units_of[index])
+            for peer in peers:
+                units.update(geo.units_of[peer])
+            self.touched_units.append(sorted(units))
+
+tables = {}
+
+def tables_for(geo):
+    """Return the Tables of a geometry, building them on first use."""
+    if geo.box not in tables:
+        tables[geo.box] = Tables(geo)
+    return tables[geo.box]
+
+
+class FlatSolver():
+    """
+    The state of one solve in preallocated flat lists. Like
+    dlx.DancingLinks, it has solve() and count(limit), and keeps the
+    first solution it finds as its solution attribute.
+
+    """
+    def __init__(self, board, timeout=None, instrument=None, max_nodes=None):
+        self.board = board
+        self.timeout = timeout
+        self.instrument = instrument
+        # How many numbers the search may try before NodeLimit is
+        # raised. They are only counted when there is a limit, since
+        # the count soon needs ints that CPython allocates.
+        self.max_nodes = max_nodes
+        self.geometry = geo = geometry_for(board)
+        self.tables = tables_for(geo)
+        self.solution = None
+        self.found = 0
+
+        size = geo.size
+        cells = geo.num_cells
+        self.cells = [0] * cells
+        # blocked[index][num] is how many peers of the cell hold num,
+        # and choices[index] how many numbers none of them holds.
+        self.blocked = [[0] * (size + 1) for _ in range(cells)]
+        self.choices = [size] * cells
+        # holds[unit][num] is whether the unit holds num, and
+        # places[unit][num] in how many of its empty cells num is valid.
+        self.holds = [[False] * (size + 1) for _ in range(3 * size)]
+        self.places = [[size] * (size + 1) for _ in range(3 * size)]
+        self.trail = [0] * cells
+        self.trail_length = 0
+        self.stack_cell = [0] * cells
+        self.stack_next = [0] * cells
+        self.stack_mark = [0] * cells
+        self.cell_queue = [0] * cells
+        self.cell_queued = [False] * cells
+        self.cell_head = 0
+        self.cell_count = 0
+        self.unit_queue = [0] * (3 * size)
+        self.unit_queued = [False] * (3 * size)
+        self.unit_head = 0
+        self.unit_count = 0
+
+        # The events of the givens' propagation are sent below, before
+        # any search.
+        if instrument is not None:
+            instrument.geometry = geo
+        self.valid = check_violations(board)
+        if self.valid:
+            for index, val in enumerate(val for row in board for val in row):
+                if val != ' ':
+                    self.place(index, geo.values[val])
+            # Fill the cells that the givens force, then keep them.
+            for index in range(cells):
+                self.push_cell(index)
+            for unit in range(3 * size):
+                self.push_unit(unit)
+            self.valid = self.propagate()
+            self.trail_length = 0
+
+    def place(self, index, num):
+        """
+        Write a number into the cell and mark it held by the cell's
+        units. The cell leaves the places of the numbers that were valid
+        for it, and each peer that did not have the number blocked yet
+        loses it from its choices and, if empty, from its units' places.
+
+        """
+        tab = self.tables
+        size = self.geometry.size
+        blocked = self.blocked
+        choices = self.choices
+        places = self.places
+        cells = self.cells
+        cells[index] = num
+        row, col, box = tab.cell_units[index]
+        self.holds[row][num] = True
+        self.holds[col][num] = True
+        self.holds[box][num] = True
+        row_places = places[row]
+        col_places = places[col]
+        box_places = places[box]
+        counts = blocked[index]
+        n = 1
+        while n <= size:
+            if not counts[n]:
+                row_places[n] -= 1
+                col_places[n] -= 1
+                box_places[n] -= 1
+            n += 1
+
+        peers = tab.peers[index]
+        cell_units = tab.cell_units
+        count = tab.peer_count
+        k = 0
+        while k < count:
+            peer = peers[k]
+            counts = blocked[peer]
+            if not counts[num]:
+                choices[peer] -= 1
+                if not cells[peer]:
+                    row, col, box = cell_units[peer]
+                    places[row][num] -= 1
+                    places[col][num] -= 1
+                    places[box][num] -= 1
+            counts[num] += 1
+            k += 1
+
+    def clear(self, index):
+        """
+        Empty the cell and undo what place() did for its number. Cells
+        are cleared in the reverse order they were filled in, so each
+        peer is empty or filled as it was when the number was placed.
+
+        """
+        tab = self.tables
+        size = self.geometry.size
+        blocked = self.blocked
+        choices = self.choices
+        places = self.places
+        cells = self.cells
+        num = cells[index]
+
+        peers = tab.peers[index]
+        cell_units = tab.cell_units
+        count = tab.peer_count
+        k = 0
+        while k < count:
+            peer = peers[k]
+            counts = blocked[peer]
+            counts[num] -= 1
+            if not counts[num]:
+                choices[peer] += 1
+                if not cells[peer]:
+                    row, col, box = cell_units[peer]
+                    places[row][num] += 1
+                    places[col][num] += 1
+                    places[box][num] += 1
+            k += 1
+
+        cells[index] = 0
+        row, col, box = tab.cell_units[index]
+        self.holds[row][num] = False
+        self.holds[col][num] = False
+        self.holds[box][num] = False
+        row_places = places[row]
+        col_places = places[col]
+        box_places = places[box]
+        counts = blocked[index]
+        n = 1
+        while n <= size:
+            if not counts[n]:
+                row_places[n] += 1
+                col_places[n] += 1
+                box_places[n] += 1
+            n += 1
+
+    def push_cell(self, index):
+        """Queue an empty cell for the naked single check."""
+        if self.cell_queued[index] or self.cells[index]:
+            return
+        cells = self.geometry.num_cells
+        tail = self.cell_head + self.cell_count
+        if tail >= cells:
+            tail -= cells
+        self.cell_queue[tail] = index
+        self.cell_queued[index] = True
+        self.cell_count += 1
+
+    def pop_cell(self):
+        """Take the next cell off the naked single queue."""
+        index = self.cell_queue[self.cell_head]
+        self.cell_queued[index] = False
+        self.cell_head += 1
+        if self.cell_head == self.geometry.num_cells:
+            self.cell_head = 0
+        self.cell_count -= 1
+        return index
+
+    def push_unit(self, unit):
+        """Queue a unit for the hidden single check."""
+        if self.unit_queued[unit]:
+            return
+        units = 3 * self.geometry.size
+        tail = self.unit_head + self.unit_count
+        if tail >= units:
+            tail -= units
+        self.unit_queue[tail] = unit
+        self.unit_queued[unit] = True
+        self.unit_count += 1
+
+    def pop_unit(self):
+        """Take the next unit off the hidden single queue."""
+        unit = self.unit_queue[self.unit_head]
+        self.unit_queued[unit] = False
+        self.unit_head += 1
+        if self.unit_head == 3 * self.geometry.size:
+            self.unit_head = 0
+        self.unit_count -= 1
+        return unit
+
+    def flush(self):
+        """Empty both queues after a contradiction."""
+        while self.cell_count:
+            self.pop_cell()
+        while self.unit_count:
+            self.pop_unit()
+
+    def fill(self, index, num):
+        """
+        Place a number, push the cell onto the trail, and queue the
+        empty peers and every unit of the cell and its peers, whose
+        counts have changed. The queue pushes are written out here,
+        since this is the innermost loop of the search.
+
+        """
+        tab = self.tables
+        cells = self.cells
+        self.place(index, num)
+        self.trail[self.trail_length] = index
+        self.trail_length += 1
+
+        peers = tab.peers[index]
+        count = tab.peer_count
+        queue = self.cell_queue
+        queued = self.cell_queued
+        capacity = self.geometry.num_cells
+        tail = self.cell_head + self.cell_count
+        k = 0
+        while k < count:
+            peer = peers[k]
+            if not queued[peer] and not cells[peer]:
+                if tail >= capacity:
+                    tail -= capacity
+                queue[tail] = peer
+                queued[peer] = True
+                tail += 1
+                self.cell_count += 1
+            k += 1
+
+        touched = tab.touched_units[index]
+        count = len(touched)
+        queue = self.unit_queue
+        queued = self.unit_queued
+        capacity = 3 * self.geometry.size
+        tail = self.unit_head + self.unit_count
+        k = 0
+        while k < count:
+            unit = touched[k]
+            if not queued[unit]:
+                if tail >= capacity:
+                    tail -= capacity
+                queue[tail] = unit
+                queued[unit] = True
+                tail += 1
+                self.unit_count += 1
+            k += 1
+
+    def propagate(self):
+        """
+        Run fill_forced(), counting and timing it in the instrumentation
+        as sudoku.propagate() does. Returns its result.
+
+        """
+        instrument = self.instrument
+        if instrument is None:
+            return self.fill_forced()
+        instrument.propagations += 1
+        start = time.perf_counter()
+        try:
+            return self.fill_forced()
+        finally:
+            instrument.propagation_time += time.perf_counter() - start
+
+    def fill_forced(self):
+        """
+        Fill every naked and hidden single that the queued cells and
+        units lead to, as sudoku.fill_forced() does. Returns False as
+        soon as a contradiction is found, with both queues emptied.
+
+        """
+        cells = self.cells
+        blocked = self.blocked
+        choices = self.choices
+        holds = self.holds
+        places = self.places
+        unit_cells = self.tables.unit_cells
+        size = self.geometry.size
+        instrument = self.instrument
+
+        while self.cell_count or self.unit_count:
+            # Naked singles: a cell with exactly one valid number, which
+            # is the one none of its peers holds.
+            while self.cell_count:
+                index = self.pop_cell()
+                if cells[index]:
+                    continue
+                if not choices[index]:
+                    self.flush()
+                    return False
+                if choices[index] == 1:
+                    counts = blocked[index]
+                    num = 1
+                    while counts[num]:
+                        num += 1
+                    self.fill(index, num)
+                    if instrument is not None:
+                        instrument.naked_singles += 1
+                        instrument.emit('place', index, num)
+
+            # Hidden singles: a number with exactly one place in a unit.
+            # A number the unit neither holds nor has a place for is a
+            # contradiction.
+            while self.unit_count and not self.cell_count:
+                unit = self.pop_unit()
+                held = holds[unit]
+                unit_places = places[unit]
+                num = 1
+                while num <= size:
+                    if not held[num]:
+                        if not unit_places[num]:
+                            self.flush()
+                            return False
+                        if unit_places[num] == 1:
+                            cells_of = unit_cells[unit]
+                            k = 0
+                            while cells[cells_of[k]] or blocked[cells_of[k]][num]:
+                                k += 1
+                            index = cells_of[k]
+                            self.fill(index, num)
+                            if instrument is not None:
+                                instrument.hidden_singles += 1
+                                instrument.emit('place', index, num)
+                    num += 1
+        return True
+
+    def undo(self, mark):
+        """Empty the cells filled since the trail was mark long."""
+        instrument = self.instrument
+        trail = self.trail
+        while self.trail_length > mark:
+            self.trail_length -= 1
+            index = trail[self.trail_length]
+            if instrument is not None:
+                instrument.emit('remove', index, 0)
+            self.clear(index)
+
+    def choose_cell(self):
+        """
+        Return the first empty cell with the fewest valid numbers, or -1
+        if the board is full.
+
+        """
+        cells = self.cells
+        choices = self.choices
+        num_cells = self.geometry.num_cells
+        best = -1
+        best_count = self.geometry.size + 1
+        index = 0
+        while index < num_cells:
+            if not cells[index]:
+                count = choices[index]
+                if count < best_count:
+                    best = index
+                    best_count = count
+                    # Nothing beats a cell with no choices or a single one.
+                    if count <= 1:
+                        break
+            index += 1
+        return best
+
+    def search(self, limit):
+        """
+        Search in mrv order until limit solutions have been found or
+        there are no more, keeping the first as self.solution. Returns
+        the count. The search is a loop over the preallocated stack.
+
+        """
+        self.solution = None
+        self.found = 0
+        if not self.valid:
+            return 0
+        instrument = self.instrument
+        start = time.perf_counter()
+        if instrument is None:
+            self.search_loop(limit, start)
+            return self.found
+        propagation_time = instrument.propagation_time
+        try:
+            self.search_loop(limit, start)
+        finally:
+            instrument.search_time += (time.perf_counter() - start
+                                       - (instrument.propagation_time - propagation_time))
+        return self.found
+
+    def search_loop(self, limit, start):
+        """The loop of search(), raising SolveTimeout past the deadline."""
+        instrument = self.instrument
+        deadline = None if self.timeout is None else start + self.timeout
+        size = self.geometry.size
+        choices = self.choices
+        stack_cell = self.stack_cell
+        stack_next = self.stack_next
+        stack_mark = self.stack_mark
+
+        max_nodes = self.max_nodes
+        nodes = 0
+        depth = 0
+        backtracking = False
+        steps = 0
+        while True:
+            if deadline is not None:
+                steps += 1
+                if steps == DEADLINE_INTERVAL:
+                    steps = 0
+                    if time.perf_counter() > deadline:
+                        raise SolveTimeout()
+
+            if not backtracking:
+                index = self.choose_cell()
+                if index < 0:
+                    self.found += 1
+                    if self.solution is None:
+                        self.solution = self.board_from()
+                    if self.found >= limit:
+                        return
+                    backtracking = True
+                    continue
+                if not choices[index]:
+                    backtracking = True
+                    continue
+                stack_cell[depth] = index
+                stack_next[depth] = 1
+                stack_mark[depth] = self.trail_length
+                depth += 1
+                if instrument is not None and depth > instrument.max_depth:
+                    instrument.max_depth = depth
+            else:
+                # Take back the deepest choice.
+                if not depth:
+                    return
+                self.undo(stack_mark[depth - 1])
+                if instrument is not None:
+                    instrument.backtracks += 1
+
+            # Try the next number of the deepest choice, or give the
+            # choice up if it has no numbers left to try.
+            index = stack_cell[depth - 1]
+            counts = self.blocked[index]
+            num = stack_next[depth - 1]
+            while num <= size and counts[num]:
+                num += 1
+            if num > size:
+                depth -= 1
+                backtracking = True
+                continue
+            stack_next[depth - 1] = num + 1
+            if max_nodes is not None:
+                nodes += 1
+                if nodes > max_nodes:
+                    raise NodeLimit()
+            self.fill(index, num)
+            if instrument is not None:
+                instrument.nodes += 1
+                instrument.emit('place', index, num)
+            backtracking = not self.propagate()
+            if backtracking and instrument is not None:
+                instrument.contradictions += 1
+                instrument.emit('contradiction', index, num)
+
+    def board_from(self):
+        """Return the current board as rows of one-character strings."""
+        geo = self.geometry
+        cells = self.cells
+        return [[geo.digits[cells[i*geo.size + j]] for j in range(geo.size)]
+                for i in range(geo.size)]
+
+    def solve(self):
+        """Return the solution of the board, or None."""
+        self.search(1)
+        return self.solution
+
+    def count(self, limit=2):
+        """Count the solutions of the board, stopping at limit."""
+        if limit < 1:
+            return 0
+        return self.search(limit)
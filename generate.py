@@ -0,0 +1,184 @@
+"""
+Generate new puzzles that have exactly one solution.
+
+A random full grid is built by the engine, and then clues are taken
+away in random order, a symmetric group of cells at a time. A removal
+is kept only if count_solutions() still finds a single solution, so
+every puzzle is proper. Removal stops at the target clue count, or
+when no more clues can be taken away. Generating a puzzle is
+seeded, so the same seed always gives the same puzzles, however many
+worker processes are used.
+
+Usage: python generate.py [--count N] [--clues N] [--size 4|9|16|25]
+                          [--symmetry none|rotational|mirror|diagonal]
+                          [--seed N] [--workers N] [--output FILE]
+
+"""
+import argparse
+import math
+import random
+import sys
+
+from batch import dispatch, make_chunks
+from puzzle_io import SIZES, write_puzzles
+from sudoku import NodeLimit, Solver, count_solutions, geometry
+
+
+# The cells each cell is paired with, under each symmetry, on a board
+# whose last row and column are numbered last.
+SYMMETRIES = {
+    'none': lambda i, j, last: [(i, j)],
+    'rotational': lambda i, j, last: [(i, j), (last - i, last - j)],
+    'mirror': lambda i, j, last: [(i, j), (i, last - j)],
+    'diagonal': lambda i, j, last: [(i, j), (j, i)],
+}
+# Full attempts made at reaching a clue count that is hard to reach.
+ATTEMPTS = 5
+# Values a uniqueness check may try before the removal is refused. A
+# limit on the search rather than on its time keeps the removals the
+# same on every machine. 9x9 checks try a few dozen at most, and this
+# lets a 16x16 check run for about a second.
+CHECK_NODES = 2000
+
+
+def full_grid(rng, box=3):
+    """
+    Return a random solved board of the given box size. The diagonal
+    subgrids share no units, so they are filled with random
+    permutations, the engine fills in the rest, and the values are
+    relabelled at random. On the smaller boards a random start can
+    rule out every solution, and then another one is drawn.
+
+    """
+    symbols = geometry(box).digits[1:]
+    size = len(symbols)
+    solution = None
+    while solution is None:
+        board = [[' '] * size for _ in range(size)]
+        for diagonal in range(box):
+            numbers = rng.sample(symbols, size)
+            for k, num in enumerate(numbers):
+                board[diagonal*box + k // box][diagonal*box + k % box] = num
+        solution = Solver(board, 'mrv', 'random', rng.random()).run()
+    labels = dict(zip(symbols, rng.sample(symbols, size)))
+    return [[labels[val] for val in row] for row in solution]
+
+def cell_groups(symmetry, size=9):
+    """Return the groups of cells that are emptied together."""
+    pair = SYMMETRIES[symmetry]
+    groups = []
+    seen = set()
+    for i in range(size):
+        for j in range(size):
+            if (i, j) not in seen:
+                group = sorted(set(pair(i, j, size - 1)))
+                seen.update(group)
+                groups.append(group)
+    return groups
+
+def remove_clues(solution, rng, clues=0, symmetry='none'):
+    """
+    Empty groups of cells of a solved board in random order, keeping
+    only the removals after which the puzzle still has one solution.
+    A removal whose check runs past CHECK_NODES is refused too. Stops
+    once the puzzle has no more than clues clues.
+
+    """
+    board = [row[:] for row in solution]
+    groups = cell_groups(symmetry, len(solution))
+    rng.shuffle(groups)
+    remaining = len(solution) ** 2
+    for group in groups:
+        if remaining <= clues:
+            break
+        for i, j in group:
+            board[i][j] = ' '
+        try:
+            unique = count_solutions(board, max_nodes=CHECK_NODES) == 1
+        except NodeLimit:
+            unique = False
+        if unique:
+            remaining -= len(group)
+        else:
+            for i, j in group:
+                board[i][j] = solution[i][j]
+    return board
+
+def clue_count(board):
+    """Return the number of filled cells of a board."""
+    return sum(1 for row in board for val in row if val != ' ')
+
+def generate_puzzle(seed, clues=0, symmetry='none', attempts=ATTEMPTS, box=3):
+    """
+    Return a puzzle with a single solution, generated from the seed.
+    With a target clue count that a first attempt misses, up to
+    attempts new grids are tried and the puzzle with the fewest clues
+    is kept.
+
+    """
+    if symmetry not in SYMMETRIES:
+        raise ValueError('Unknown symmetry {!r}'.format(symmetry))
+    rng = random.Random(seed)
+    best = None
+    for _ in range(attempts):
+        board = remove_clues(full_grid(rng, box), rng, clues, symmetry)
+        if best is None or clue_count(board) < clue_count(best):
+            best = board
+        if not clues or clue_count(best) <= clues:
+            break
+    return best
+
+def generate_chunk(chunk):
+    """Generate puzzles for a list of (seed, clues, symmetry, box) jobs."""
+    return [generate_puzzle(seed, clues, symmetry, box=box)
+            for seed, clues, symmetry, box in chunk]
+
+def generate_puzzles(count, clues=0, symmetry='none', seed=None, workers=None, chunk_size=4,
+                     size=9):
+    """
+    Generate count puzzles across a pool of worker processes and yield
+    them in order. Puzzle k is generated from its own seed derived from
+    seed and k, so the output does not depend on the number of
+    workers.
+
+    """
+    if seed is None:
+        seed = random.randrange(2**32)
+    box = math.isqrt(size)
+    jobs = (('{}:{}'.format(seed, k), clues, symmetry, box) for k in range(count))
+    if workers == 1:
+        return (generate_puzzle(seed, clues, symmetry, box=box)
+                for seed, clues, symmetry, box in jobs)
+    return dispatch(generate_chunk, make_chunks(jobs, chunk_size), workers, True)
+
+def main():
+    """Generate puzzles and write them in the format of puzzles.txt."""
+    parser = argparse.ArgumentParser(description='Generate Sudoku puzzles with one solution.')
+    parser.add_argument('--count', type=int, default=10,
+                        help='number of puzzles to generate (default: 10)')
+    parser.add_argument('--clues', type=int, default=0,
+                        help='stop removing clues at this many (default: as few as possible)')
+    parser.add_argument('--symmetry', choices=list(SYMMETRIES), default='none',
+                        help='pattern the clues follow (default: none)')
+    parser.add_argument('--size', type=int, choices=SIZES, default=9,
+                        help='number of rows of the board (default: 9)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for repeatable output')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--start', type=int, default=1,
+                        help='number of the first Grid header (default: 1)')
+    parser.add_argument('--output', default=None,
+                        help='file to append the puzzles to (default: stdout)')
+    args = parser.parse_args()
+
+    puzzles = generate_puzzles(args.count, args.clues, args.symmetry, args.seed, args.workers,
+                               size=args.size)
+    if args.output is None:
+        write_puzzles(puzzles, sys.stdout, start=args.start)
+    else:
+        with open(args.output, 'a') as f_out:
+            write_puzzles(puzzles, f_out, start=args.start)
+
+if __name__ == '__main__':
+    main()
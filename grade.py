@@ -0,0 +1,431 @@
+"""
+Grade puzzles by the logical techniques needed to solve them, without
+trial and error.
+
+A puzzle is solved by always applying the easiest technique that makes
+progress: naked and hidden singles (the pre-pass of the original
+algorithm), then locked candidates (pointing and claiming), naked and
+hidden pairs and triples, X-wings, and swordfish. The grade is the
+hardest technique that was needed, with its rating as the score. A
+puzzle the techniques cannot finish is graded 'search', if it has a
+solution at all.
+
+Usage: python grade.py [puzzle_file] [--workers N] [--chunk-size N]
+                       [--output FILE]
+
+"""
+import argparse
+import time
+from collections import Counter, namedtuple
+from functools import lru_cache
+from itertools import combinations
+
+from batch import dispatch, make_chunks
+from puzzle_io import read_puzzles
+from sudoku import (ALL_MASK, BOX_OF, COL_OF, PEERS, POPCOUNT, ROW_OF, UNITS,
+                    check_violations, count_solutions)
+
+
+# Every technique with its rating, in the order they are tried.
+TECHNIQUES = (
+    ('naked_single', 1.0),
+    ('hidden_single', 1.5),
+    ('pointing', 2.6),
+    ('claiming', 2.8),
+    ('naked_pair', 3.0),
+    ('x_wing', 3.2),
+    ('hidden_pair', 3.4),
+    ('naked_triple', 3.6),
+    ('swordfish', 3.8),
+    ('hidden_triple', 4.0),
+)
+RATINGS = dict(TECHNIQUES, search=10.0)
+# The level of a puzzle by its score: the highest score of each level.
+LEVELS = (('easy', 1.5), ('medium', 2.8), ('hard', 4.0), ('expert', RATINGS['search']))
+
+Grade = namedtuple('Grade', ['technique', 'score', 'level', 'steps'])
+
+# A single deduction: the technique, the cells that make up its pattern,
+# the (index, num) placements it makes, and the (index, mask) candidates
+# it eliminates.
+Deduction = namedtuple('Deduction', ['technique', 'cells', 'placements', 'eliminations'])
+
+
+class Candidates():
+    """
+    The numbers still possible in every cell: a flat list of the 81
+    cell values (0 for an empty cell) and one 9-bit candidate mask per
+    cell (0 for a filled cell).
+
+    """
+    def __init__(self, board):
+        self.cells = [0] * 81
+        self.masks = [ALL_MASK] * 81
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val != ' ':
+                    self.place(i*9 + j, int(val))
+
+    def place(self, index, num):
+        """Fill the cell and remove the number from its peers."""
+        bit = 1 << (num - 1)
+        self.cells[index] = num
+        self.masks[index] = 0
+        for peer in PEERS[index]:
+            self.masks[peer] &= ~bit
+
+    def apply(self, deduction):
+        """Make the placements and eliminations of a deduction."""
+        for index, num in deduction.placements:
+            self.place(index, num)
+        for index, mask in deduction.eliminations:
+            self.masks[index] &= ~mask
+
+    def solved(self):
+        """Return True once every cell is filled."""
+        return all(self.cells)
+
+    def stuck(self):
+        """Return True if an empty cell has no candidates left."""
+        return any(not cell and not mask for cell, mask in zip(self.cells, self.masks))
+
+    def positions(self, unit, bit):
+        """Return the cells of a unit that still have the number as a candidate."""
+        masks = self.masks
+        return [index for index in UNITS[unit] if masks[index] & bit]
+
+
+def eliminations_from(state, cells, mask, keep=()):
+    """
+    Return the (index, mask) eliminations that remove the numbers of
+    mask from the cells, leaving the cells in keep alone.
+
+    """
+    eliminations = []
+    for index in cells:
+        if index not in keep and state.masks[index] & mask:
+            eliminations.append((index, state.masks[index] & mask))
+    return eliminations
+
+def find_naked_single(state):
+    """A cell with a single candidate takes it."""
+    for index, mask in enumerate(state.masks):
+        if POPCOUNT[mask] == 1:
+            return Deduction('naked_single', (index,), [(index, mask.bit_length())], [])
+    return None
+
+def find_hidden_single(state):
+    """A number with a single place in a unit goes there."""
+    masks = state.masks
+    for unit in range(27):
+        # The numbers with at least one place in the unit, and with two.
+        once = twice = 0
+        for index in UNITS[unit]:
+            twice |= once & masks[index]
+            once |= masks[index]
+        single = once & ~twice
+        if single:
+            bit = single & -single
+            positions = state.positions(unit, bit)
+            return Deduction('hidden_single', tuple(positions),
+                             [(positions[0], bit.bit_length())], [])
+    return None
+
+def count_places(state, unit):
+    """
+    Return the masks of the numbers with at least one, two, three, and
+    four places left in a unit, found in one pass over its cells.
+
+    """
+    masks = state.masks
+    one = two = three = four = 0
+    for index in UNITS[unit]:
+        mask = masks[index]
+        four |= three & mask
+        three |= two & mask
+        two |= one & mask
+        one |= mask
+    return one, two, three, four
+
+def only_one_of(first, second, third):
+    """Return the mask of the numbers in exactly one of three masks."""
+    return (first | second | third) & ~((first & second) | (first & third) | (second & third))
+
+def find_pointing(state):
+    """
+    A number whose places in a subgrid all lie in one row or column
+    can be removed from the rest of that row or column.
+
+    """
+    masks = state.masks
+    for box in range(9):
+        # The candidates of each row and column of the subgrid, and the
+        # numbers with two places or more in it.
+        rows = [0, 0, 0]
+        cols = [0, 0, 0]
+        one = two = 0
+        for k, index in enumerate(UNITS[18 + box]):
+            mask = masks[index]
+            rows[k // 3] |= mask
+            cols[k % 3] |= mask
+            two |= one & mask
+            one |= mask
+        along_row = only_one_of(*rows) & two
+        along_col = only_one_of(*cols) & two
+        if not along_row | along_col:
+            continue
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            for along, line_of, offset in ((along_row, ROW_OF, 0), (along_col, COL_OF, 9)):
+                if along & bit:
+                    positions = state.positions(18 + box, bit)
+                    eliminations = eliminations_from(
+                        state, UNITS[offset + line_of[positions[0]]], bit, positions)
+                    if eliminations:
+                        return Deduction('pointing', tuple(positions), [], eliminations)
+    return None
+
+def find_claiming(state):
+    """
+    A number whose places in a row or column all lie in one subgrid can
+    be removed from the rest of that subgrid.
+
+    """
+    masks = state.masks
+    for unit in range(18):
+        # The candidates of the three cells the unit shares with each
+        # subgrid it crosses, and the numbers with two places or more.
+        segments = [0, 0, 0]
+        one = two = 0
+        for k, index in enumerate(UNITS[unit]):
+            mask = masks[index]
+            segments[k // 3] |= mask
+            two |= one & mask
+            one |= mask
+        claims = only_one_of(*segments) & two
+        if not claims:
+            continue
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            if claims & bit:
+                positions = state.positions(unit, bit)
+                eliminations = eliminations_from(state, UNITS[18 + BOX_OF[positions[0]]], bit,
+                                                 positions)
+                if eliminations:
+                    return Deduction('claiming', tuple(positions), [], eliminations)
+    return None
+
+def find_naked_subset(state, size, technique):
+    """
+    When size cells of a unit have only size numbers between them,
+    those numbers can be removed from the rest of the unit.
+
+    """
+    masks = state.masks
+    for unit in range(27):
+        empty = [index for index in UNITS[unit] if masks[index]]
+        if len(empty) <= size:
+            continue
+        # Only cells with size candidates or fewer can be in the subset.
+        small = [index for index in empty if POPCOUNT[masks[index]] <= size]
+        for cells in combinations(small, size):
+            mask = 0
+            for index in cells:
+                mask |= masks[index]
+            if POPCOUNT[mask] == size:
+                eliminations = eliminations_from(state, empty, mask, cells)
+                if eliminations:
+                    return Deduction(technique, cells, [], eliminations)
+    return None
+
+def find_hidden_subset(state, size, technique):
+    """
+    When size numbers of a unit can only go in the same size cells,
+    every other number can be removed from those cells.
+
+    """
+    for unit in range(27):
+        _, two, three, four = count_places(state, unit)
+        # The numbers with two to size places.
+        wanted = two & ~(three if size == 2 else four)
+        if POPCOUNT[wanted] < size:
+            continue
+        # The places of each of those numbers, as a mask of the
+        # positions of the cells within the unit.
+        cells = UNITS[unit]
+        places = {}
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            if wanted & bit:
+                places[num] = sum(1 << k for k, index in enumerate(cells)
+                                  if state.masks[index] & bit)
+        for nums in combinations(places, size):
+            spots = 0
+            for num in nums:
+                spots |= places[num]
+            if POPCOUNT[spots] == size:
+                mask = 0
+                for num in nums:
+                    mask |= 1 << (num - 1)
+                subset = [index for k, index in enumerate(cells) if spots & (1 << k)]
+                eliminations = eliminations_from(state, subset, ALL_MASK & ~mask)
+                if eliminations:
+                    return Deduction(technique, tuple(subset), [], eliminations)
+    return None
+
+def find_fish(state, size, technique):
+    """
+    When a number's places in size rows all lie in the same size
+    columns, it can be removed from the rest of those columns, and the
+    same with rows and columns swapped.
+
+    """
+    for base, cover in ((0, 9), (9, 0)):
+        # The numbers with two to size places in each line.
+        wanted = []
+        for line in range(9):
+            _, two, three, four = count_places(state, base + line)
+            wanted.append(two & ~(three if size == 2 else four))
+        for num in range(1, 10):
+            bit = 1 << (num - 1)
+            lines = {}
+            for line in range(9):
+                if wanted[line] & bit:
+                    lines[line] = state.positions(base + line, bit)
+            for chosen in combinations(lines, size):
+                cells = [index for line in chosen for index in lines[line]]
+                # The line crossing each cell in the cover direction.
+                crossing = ROW_OF if cover == 0 else COL_OF
+                covers = {crossing[index] for index in cells}
+                if len(covers) != size:
+                    continue
+                eliminations = []
+                for line in covers:
+                    eliminations += eliminations_from(state, UNITS[cover + line], bit, cells)
+                if eliminations:
+                    return Deduction(technique, tuple(sorted(cells)), [], eliminations)
+    return None
+
+FINDERS = {
+    'naked_single': find_naked_single,
+    'hidden_single': find_hidden_single,
+    'pointing': find_pointing,
+    'claiming': find_claiming,
+    'naked_pair': lambda state: find_naked_subset(state, 2, 'naked_pair'),
+    'x_wing': lambda state: find_fish(state, 2, 'x_wing'),
+    'hidden_pair': lambda state: find_hidden_subset(state, 2, 'hidden_pair'),
+    'naked_triple': lambda state: find_naked_subset(state, 3, 'naked_triple'),
+    'swordfish': lambda state: find_fish(state, 3, 'swordfish'),
+    'hidden_triple': lambda state: find_hidden_subset(state, 3, 'hidden_triple'),
+}
+
+
+def next_deduction(state):
+    """Return the easiest deduction that makes progress, or None."""
+    for technique, _ in TECHNIQUES:
+        deduction = FINDERS[technique](state)
+        if deduction is not None:
+            return deduction
+    return None
+
+def level_of(score):
+    """Return the name of the level a score falls in."""
+    for level, highest in LEVELS:
+        if score <= highest:
+            return level
+    return LEVELS[-1][0]
+
+def grade(board):
+    """
+    Grade the given board and return a Grade: the hardest technique
+    needed (or 'search' if the techniques cannot finish it, or None if
+    it has no solution), its rating as the score, the level of that
+    score, and a dict of how many times each technique was used.
+    Results are cached per puzzle. Only 9x9 boards can be graded.
+
+    """
+    if len(board) != 9:
+        raise ValueError('Only 9x9 boards can be graded')
+    return grade_key(''.join(''.join(row) for row in board))
+
+@lru_cache(maxsize=100000)
+def grade_key(key):
+    """Grade a puzzle given as an 81-character string with ' ' for empty cells."""
+    board = [list(key[i*9:i*9 + 9]) for i in range(9)]
+    if not check_violations(board):
+        return Grade(None, 0.0, None, {})
+    state = Candidates(board)
+    steps = Counter()
+    hardest = None
+    while not state.solved():
+        if state.stuck():
+            return Grade(None, 0.0, None, dict(steps))
+        deduction = next_deduction(state)
+        if deduction is None:
+            # The techniques never rule out a solution, so only a
+            # puzzle left open by them can still turn out to have none.
+            if not count_solutions(board, limit=1):
+                return Grade(None, 0.0, None, dict(steps))
+            hardest = 'search'
+            break
+        steps[deduction.technique] += 1
+        if hardest is None or RATINGS[deduction.technique] > RATINGS[hardest]:
+            hardest = deduction.technique
+        state.apply(deduction)
+    score = RATINGS.get(hardest, 0.0)
+    return Grade(hardest, score, level_of(score), dict(steps))
+
+def grade_chunk(chunk):
+    """Grade a list of (index, board) jobs inside a worker process."""
+    return [(index, grade(board)) for index, board in chunk]
+
+def grade_batch(boards, workers=None, chunk_size=64, ordered=True):
+    """
+    Grade every board of the given iterable in a pool of worker
+    processes and yield (index, Grade) pairs, as batch.solve_batch()
+    does for solutions.
+
+    """
+    jobs = enumerate(boards)
+    return dispatch(grade_chunk, make_chunks(jobs, chunk_size), workers, ordered)
+
+def main():
+    """Grade every puzzle in a file and report how many fall in each level."""
+    parser = argparse.ArgumentParser(description='Grade Sudoku puzzles by difficulty.')
+    parser.add_argument('path', nargs='?', default='puzzles.txt',
+                        help="puzzle file to grade, or '-' for stdin (default: puzzles.txt)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help='puzzles sent to a worker at a time (default: 64)')
+    parser.add_argument('--output', default=None,
+                        help='write "index,level,technique,score" lines to this file')
+    args = parser.parse_args()
+
+    levels = Counter()
+    techniques = Counter()
+    f_out = open(args.output, 'w') if args.output else None
+    start = time.perf_counter()
+    try:
+        for index, result in grade_batch(read_puzzles(args.path), args.workers,
+                                         args.chunk_size):
+            levels[result.level or 'invalid'] += 1
+            techniques[result.technique or 'invalid'] += 1
+            if f_out is not None:
+                f_out.write('{},{},{},{}\n'.format(index, result.level or 'invalid',
+                                                   result.technique or 'invalid', result.score))
+    finally:
+        if f_out is not None:
+            f_out.close()
+    elapsed = time.perf_counter() - start
+
+    total = sum(levels.values())
+    print('Graded {} puzzles in {:.3f}s ({:.1f} puzzles/s)'.format(
+        total, elapsed, total / elapsed if elapsed else 0.0))
+    print(', '.join('{}: {}'.format(level, levels[level])
+                    for level in [name for name, _ in LEVELS] + ['invalid'] if levels[level]))
+    print('Hardest technique: ' + ', '.join(
+        '{}: {}'.format(technique, count) for technique, count in techniques.most_common()))
+
+if __name__ == '__main__':
+    main()
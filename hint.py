@@ -0,0 +1,129 @@
+"""
+Hints for interactive play: the next logical deduction from the board
+as the player has it, with the technique and the cells involved.
+
+A HintState is a PlayState that also keeps the candidates of every
+cell, updated as each entry is made. An entry only touches the masks
+of its own three units and the candidates of the cell and its 20 peers,
+so a hint never starts by rebuilding the candidates from the board, and
+each player of many keeps a state of their own. The deductions are
+found by the techniques of grade.py, easiest first.
+
+Hints are only given for 9x9 boards, like grades.
+
+"""
+from grade import Candidates, next_deduction
+from play import PlayState
+from sudoku import ALL_MASK, PEERS, UNITS_OF
+
+
+class HintState(PlayState, Candidates):
+    """
+    The entries of a PlayState, with the 9-bit candidate mask of every
+    cell kept as in grade.Candidates, so that the finders of grade.py
+    can run on it directly. A candidate is a number none of the cell's
+    units holds, unless an earlier hint eliminated it.
+
+    """
+    def __init__(self, board):
+        if len(board) != 9:
+            raise ValueError('Hints need a 9x9 board')
+        # The numbers each unit holds, as a mask.
+        self.used = [0] * 27
+        self.masks = [ALL_MASK] * 81
+        # The candidates removed from each cell by the hints given so
+        # far, and the cells that have any.
+        self.removed = [0] * 81
+        self.eliminated = set()
+        # True once a hint found nothing, until the next entry.
+        self.exhausted = False
+        # PlayState enters the givens through set_cell().
+        super().__init__(board)
+
+    def set_cell(self, i, j, val):
+        """
+        Enter val (' ' to clear) into the cell, as PlayState.set_cell()
+        does, and bring the candidates of the cell and its peers up to
+        date. Clearing or changing an entry also forgets the
+        eliminations of earlier hints, which may have relied on it.
+
+        """
+        index = i*9 + j
+        old = self.cells[index]
+        changed = super().set_cell(i, j, val)
+        num = self.cells[index]
+        if num == old:
+            return changed
+
+        self.exhausted = False
+        for unit in UNITS_OF[index]:
+            if old and not self.counts[unit][old]:
+                self.used[unit] &= ~(1 << (old - 1))
+            if num:
+                self.used[unit] |= 1 << (num - 1)
+        if old and self.eliminated:
+            stale = self.eliminated
+            self.eliminated = set()
+            for cell in stale:
+                self.removed[cell] = 0
+            self.update(stale)
+        self.update((index,) + PEERS[index])
+        return changed
+
+    def update(self, cells):
+        """Recompute the candidates of the given cells."""
+        cells_now = self.cells
+        used = self.used
+        removed = self.removed
+        masks = self.masks
+        for cell in cells:
+            if cells_now[cell]:
+                masks[cell] = 0
+            else:
+                row, col, box = UNITS_OF[cell]
+                masks[cell] = ALL_MASK & ~(used[row] | used[col] | used[box] | removed[cell])
+
+    def hint(self):
+        """
+        Return the easiest deduction the board allows as a
+        grade.Deduction, or None if there is none or if the board has
+        conflicting entries or a cell without candidates. The
+        eliminations of the deduction are kept, so the next hint builds
+        on them, and its placements are left for the player to make.
+
+        """
+        if self.exhausted or self.conflicts or self.stuck():
+            return None
+        deduction = next_deduction(self)
+        if deduction is None:
+            self.exhausted = True
+        else:
+            for index, mask in deduction.eliminations:
+                self.removed[index] |= mask
+                self.masks[index] &= ~mask
+                self.eliminated.add(index)
+        return deduction
+
+def play_state_for(board):
+    """Return a HintState for a 9x9 board, and a PlayState otherwise."""
+    if len(board) == 9:
+        return HintState(board)
+    return PlayState(board)
+
+def cell_name(index):
+    """Name a cell by its row and column, such as 'r2c7'."""
+    return 'r{}c{}'.format(index // 9 + 1, index % 9 + 1)
+
+def numbers_in(mask):
+    """Return the numbers of a candidate mask as a string, such as '27'."""
+    return ''.join(str(num) for num in range(1, 10) if mask & (1 << (num - 1)))
+
+def describe(deduction):
+    """Describe a deduction in a line for the player."""
+    technique = deduction.technique.replace('_', ' ')
+    if deduction.placements:
+        return '{}: {}'.format(technique, ', '.join(
+            '{} goes in {}'.format(num, cell_name(index)) for index, num in deduction.placements))
+    return '{}: remove {}'.format(technique, ', '.join(
+        '{} from {}'.format(numbers_in(mask), cell_name(index))
+        for index, mask in deduction.eliminations))
@@ -0,0 +1,93 @@
+"""
+The wx front-end of main.py: the board frame of board_frame.py with the
+naive backtracking algorithm, which checks the whole board for
+violations after every number it tries.
+
+"""
+import wx
+
+from board_frame import BoardFrame
+from sudoku import check_solution, check_violations, move
+
+
+class MyFrame(BoardFrame):
+    """The board frame, solved by naive backtracking."""
+    def on_solve(self, event):
+        """
+        Solve the Sudoku based on the values that are present on the
+        board.
+
+        """
+        not_tried = dict()
+        my_board = []
+        for i, row in enumerate(self.button_list):
+            my_board.append([])
+            for j, button in enumerate(row):
+                button_label = button.GetLabel()
+                my_board[i].append(button_label)
+                if button_label == ' ':
+                    not_tried[(i, j)] = set(self.geometry.symbol_set)
+                else:
+                    not_tried[(i, j)] = None
+
+        if self.solving():
+            return
+        self.start_solve(self.run_solve, my_board, not_tried)
+
+    def run_solve(self, my_board, not_tried, feed):
+        """
+        Run the backtracking algorithm. This is called on a background
+        thread, so it only reports cell changes through the feed.
+
+        """
+        # The direction of the backtracking algorithm belongs to this
+        # solve only, so a new solve always starts moving forward.
+        self.direction = 'f'
+        i = 0
+        j = 0
+        while i < self.NUM_GRID_ROWS and j < self.NUM_GRID_COLS:
+            i, j = self.fill_cell(i, j, my_board, not_tried, feed)
+        wx.CallAfter(self.on_solve_done, my_board, self.direction == 'f')
+
+    def on_solve_done(self, my_board, solved):
+        """Show the final board once the background solve has finished."""
+        if solved:
+            print('Win!')
+        else:
+            print('No solution!')
+        self.finish_solve(my_board)
+        if check_solution(my_board):
+            print('Solution is valid!')
+
+    def fill_cell(self, i, j, my_board, not_tried, feed):
+        """
+        Fill the cell and keep moving forward if a valid value can be
+        found. Otherwise, keep the cell empty and move backwards. If
+        the cell was 'given', move over it without altering its value.
+
+        """
+        # This cell was 'given'. Just move over it.
+        if not_tried[(i, j)] is None:
+            return move(i, j, self.direction, self.NUM_GRID_ROWS)
+
+        else:
+            # Try to find a number that works.
+            numbers_in_row = set(my_board[i])
+            while not_tried[(i, j)] - numbers_in_row:
+                my_board[i][j] = min(not_tried[(i, j)] - numbers_in_row)
+                feed.push(i, j, my_board[i][j])
+                not_tried[(i, j)].remove(my_board[i][j])
+                status = check_violations(my_board)
+
+                # A number that works was found. Move forward.
+                if status:
+                    self.direction = 'f'
+                    return move(i, j, self.direction, self.NUM_GRID_ROWS)
+
+            # We only make it to here if there is no number that works
+            # in that cell. Reset the cell and move backward.
+            not_tried[(i, j)] = set(self.geometry.symbol_set)
+            my_board[i][j] = ' '
+            feed.push(i, j, my_board[i][j])
+            self.direction = 'b'
+            return move(i, j, self.direction, self.NUM_GRID_ROWS)
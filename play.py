@@ -0,0 +1,104 @@
+"""
+Board state for interactive play. Every entry updates the count of
+each number in the entry's row, column, and subgrid, so conflicts are
+found by looking only at the entry's peers instead of rescanning the
+board. A time-boxed propagation and search tells whether the board can
+still be solved.
+
+"""
+from sudoku import SolveTimeout, check_violations, geometry_for, solve
+
+
+# Seconds a solvability check may search before giving up.
+CHECK_TIMEOUT = 0.2
+# Milliseconds the GUI waits after the last entry before checking.
+CHECK_DELAY = 150
+VERDICT_LABELS = {
+    'solvable': 'Solvable',
+    'unsolvable': 'No solution from here',
+    'unknown': 'Too hard to tell quickly',
+}
+
+
+class PlayState():
+    """
+    The numbers a player has entered, with per-unit counts of each
+    number and the set of cells that currently conflict with a peer.
+
+    """
+    def __init__(self, board):
+        geo = self.geometry = geometry_for(board)
+        self.cells = [0] * geo.num_cells
+        # counts[unit][num] is how many cells of the unit hold num.
+        self.counts = [[0] * (geo.size + 1) for _ in range(3 * geo.size)]
+        self.conflicts = set()
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val != ' ':
+                    self.set_cell(i, j, val)
+
+    @property
+    def game_board(self):
+        """The board as rows of one-character strings."""
+        size = self.geometry.size
+        digits = self.geometry.digits
+        return [[digits[self.cells[i*size + j]] for j in range(size)] for i in range(size)]
+
+    def in_conflict(self, index):
+        """Return True if the cell holds a number that a peer also holds."""
+        num = self.cells[index]
+        return bool(num) and any(self.counts[unit][num] > 1
+                                 for unit in self.geometry.units_of[index])
+
+    def set_cell(self, i, j, val):
+        """
+        Enter val (' ' to clear) into the cell and return the set of
+        cells whose conflict status changed. Only the cell and its peers
+        are looked at.
+
+        """
+        geo = self.geometry
+        index = i*geo.size + j
+        old = self.cells[index]
+        num = geo.values[val]
+        if num == old:
+            return set()
+
+        if old:
+            for unit in geo.units_of[index]:
+                self.counts[unit][old] -= 1
+        self.cells[index] = num
+        if num:
+            for unit in geo.units_of[index]:
+                self.counts[unit][num] += 1
+
+        # Only the cell and the peers holding the old or new number can
+        # have changed status.
+        changed = set()
+        for cell in (index,) + geo.peers[index]:
+            if cell != index and self.cells[cell] not in (old, num):
+                continue
+            conflict = self.in_conflict(cell)
+            if conflict != (cell in self.conflicts):
+                changed.add(cell)
+                if conflict:
+                    self.conflicts.add(cell)
+                else:
+                    self.conflicts.discard(cell)
+        return changed
+
+    def verdict(self, timeout=CHECK_TIMEOUT):
+        """
+        Return 'solvable' or 'unsolvable' for the current board, or
+        'unknown' if the solver could not decide within the timeout.
+        Propagation alone settles most boards before any search.
+
+        """
+        board = self.game_board
+        if self.conflicts or not check_violations(board):
+            return 'unsolvable'
+        try:
+            solution = solve(board, strategy='mrv', timeout=timeout)
+        except SolveTimeout:
+            return 'unknown'
+        return 'unsolvable' if solution is None else 'solvable'
@@ -0,0 +1,147 @@
+"""
+Read and write puzzle files. Two formats are understood, and may be
+mixed in one file:
+
+- The 'Grid NN' block format of puzzles.txt: a header line starting
+  with 'G' followed by 9 lines of 9 digits.
+- One puzzle per line as 81 characters.
+
+In both, '0' or '.' marks an empty cell. Boards of 4x4, 16x16, and
+25x25 are read the same way, with the size taken from the length of
+the first row (or of the line), and the values beyond 9 written as
+the letters A-P. Puzzles are read lazily, one at a time, so memory use
+does not grow with the size of the file.
+
+"""
+import sys
+
+
+BLANKS = '0.'
+# The values of the cells, in order, for boards up to 25x25.
+SYMBOLS = '123456789ABCDEFGHIJKLMNOP'
+# The supported numbers of rows, and the one-line length of each.
+SIZES = (4, 9, 16, 25)
+LINE_LENGTHS = {size * size: size for size in SIZES}
+
+
+class PuzzleFormatError(ValueError):
+    """Raised for a malformed puzzle record, naming its line number."""
+    def __init__(self, line_number, message):
+        super().__init__('line {}: {}'.format(line_number, message))
+        self.line_number = line_number
+
+
+def parse_cells(text):
+    """Convert a string of digits into cells, with ' ' for an empty cell."""
+    return [' ' if char in BLANKS else char for char in text]
+
+def bad_chars(text, size=9):
+    """Return the characters of the text that are not cell values."""
+    return sorted(set(text) - set(BLANKS) - set(SYMBOLS[:size]))
+
+def read_puzzles(source='puzzles.txt', on_error=None):
+    """
+    Yield each puzzle in the source as 9 lists of 9 one-character
+    strings (or the rows of a larger or smaller board), with ' ' for
+    an empty cell. The source is a path, '-' for stdin, or an open text
+    file. A malformed record raises PuzzleFormatError, unless on_error
+    is given, in which case it is called once with the first error of
+    the record and the record is skipped.
+
+    """
+    if source == '-':
+        yield from parse_puzzles(sys.stdin, on_error)
+    elif hasattr(source, 'read'):
+        yield from parse_puzzles(source, on_error)
+    else:
+        with open(source, 'r') as f_in:
+            yield from parse_puzzles(f_in, on_error)
+
+def parse_puzzles(f_in, on_error=None):
+    """Yield each puzzle in an open text file. See read_puzzles()."""
+    def report(line_number, message):
+        error = PuzzleFormatError(line_number, message)
+        if on_error is None:
+            raise error
+        on_error(error)
+
+    # The line of the current 'Grid' header, its rows so far, the
+    # number of rows it needs, and whether any of them was malformed.
+    block_start = None
+    board = []
+    size = None
+    bad_block = False
+    for line_number, line in enumerate(f_in, 1):
+        text = line.strip()
+        if not text:
+            continue
+
+        # Rows of 16x16 and 25x25 boards may also start with 'G'.
+        if text.startswith('G') and (len(text) not in SIZES or bad_chars(text, len(text))):
+            if block_start is not None and not bad_block:
+                report(block_start, 'grid has only {} of {} rows'.format(len(board), size or 9))
+            block_start = line_number
+            board = []
+            size = None
+            bad_block = False
+            continue
+
+        if block_start is not None and size is None:
+            # The first row sets the size of the grid.
+            size = len(text) if len(text) in SIZES else 9
+
+        # A one-line puzzle inside a grid means the grid was cut short.
+        if block_start is not None and len(text) != size and len(text) in LINE_LENGTHS:
+            if not bad_block:
+                report(block_start, 'grid has only {} of {} rows'.format(len(board), size))
+            block_start = None
+
+        if block_start is not None:
+            # Only the first bad row of a grid is reported.
+            if not bad_block and len(text) != size:
+                report(line_number, 'expected {} cells, got {}'.format(size, len(text)))
+                bad_block = True
+            elif not bad_block and bad_chars(text, size):
+                report(line_number, 'invalid characters {}'.format(bad_chars(text, size)))
+                bad_block = True
+            board.append(parse_cells(text))
+            if len(board) == size:
+                if not bad_block:
+                    yield board
+                block_start = None
+            continue
+
+        line_size = LINE_LENGTHS.get(len(text))
+        if line_size is None:
+            report(line_number, "expected a 'Grid' header or a one-line puzzle")
+        elif bad_chars(text, line_size):
+            report(line_number, 'invalid characters {}'.format(bad_chars(text, line_size)))
+        else:
+            cells = parse_cells(text)
+            yield [cells[i*line_size:(i + 1)*line_size] for i in range(line_size)]
+
+    if block_start is not None and not bad_block:
+        report(block_start, 'grid has only {} of {} rows'.format(len(board), size or 9))
+
+def format_board(board, style='grid'):
+    """
+    Format a board as text in the given style: 'grid' gives a line per
+    row and 'line' a single line of every cell. Empty cells become '0'.
+
+    """
+    rows = [''.join(row).replace(' ', '0') for row in board]
+    if style == 'line':
+        return ''.join(rows)
+    return '\n'.join(rows)
+
+def write_puzzles(boards, f_out, style='grid', start=1):
+    """
+    Write the boards to an open text file in a format that
+    read_puzzles() reads back. The 'grid' style numbers each puzzle
+    with a 'Grid NN' header, counting from start.
+
+    """
+    for number, board in enumerate(boards, start):
+        if style == 'grid':
+            f_out.write('Grid {:02d}\n'.format(number))
+        f_out.write(format_board(board, style) + '\n')
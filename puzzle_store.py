@@ -0,0 +1,208 @@
+"""
+A compact binary puzzle store with random access by index. The file is
+a 16-byte header followed by fixed-size records, and is read through a
+memory map, so fetching any puzzle takes the same time however large
+the store is.
+
+Header (little-endian): the magic b'SUDK', a format version, the
+packing (1 for one byte per cell, 2 for two cells per byte), the record
+size in bytes, and the number of puzzles.
+
+Each record holds the 81 cell values 0-9 (0 for an empty cell) in
+row-major order: 81 bytes unpacked, or 41 bytes packed with the first
+cell of each pair in the high nibble.
+
+Usage: python puzzle_store.py [puzzle_file] [store_file] [--packed]
+
+"""
+import mmap
+import os
+import random
+import struct
+
+from puzzle_io import read_puzzles
+
+
+MAGIC = b'SUDK'
+VERSION = 1
+HEADER = struct.Struct('<4sBBHQ')
+UNPACKED = 1
+PACKED = 2
+RECORD_SIZES = {UNPACKED: 81, PACKED: 41}
+DIGITS = ' 123456789'
+
+
+def store_path_for(path):
+    """Return the default store path for a text puzzle file."""
+    return os.path.splitext(path)[0] + '.sdk'
+
+def is_store(path):
+    """Return True if the file at path is a puzzle store."""
+    with open(path, 'rb') as f_in:
+        return f_in.read(len(MAGIC)) == MAGIC
+
+def pack_board(board, packing=UNPACKED):
+    """Encode a 9x9 board as a single record."""
+    if len(board) != 9:
+        raise ValueError('Only 9x9 boards can be stored')
+    values = [0 if val == ' ' else int(val) for row in board for val in row]
+    if packing == UNPACKED:
+        return bytes(values)
+    values.append(0)
+    return bytes((values[k] << 4) | values[k + 1] for k in range(0, 82, 2))
+
+def unpack_record(record, packing=UNPACKED):
+    """Decode a single record into a board."""
+    if packing == UNPACKED:
+        values = record
+    else:
+        values = []
+        for byte in record:
+            values.append(byte >> 4)
+            values.append(byte & 0xF)
+    return [[DIGITS[values[i*9 + j]] for j in range(9)] for i in range(9)]
+
+def convert(source, dest=None, packed=False):
+    """
+    Write every puzzle in the source (anything read_puzzles() accepts)
+    into a new store at dest, which defaults to the source path with
+    an '.sdk' extension. Returns the number of puzzles written.
+
+    """
+    if dest is None:
+        dest = store_path_for(source)
+    packing = PACKED if packed else UNPACKED
+    count = 0
+    with open(dest, 'wb') as f_out:
+        f_out.write(HEADER.pack(MAGIC, VERSION, packing, RECORD_SIZES[packing], 0))
+        for board in read_puzzles(source):
+            f_out.write(pack_board(board, packing))
+            count += 1
+        # The count is only known once the source has been streamed.
+        f_out.seek(0)
+        f_out.write(HEADER.pack(MAGIC, VERSION, packing, RECORD_SIZES[packing], count))
+    return count
+
+
+class PuzzleStore():
+    """
+    A read-only, memory-mapped puzzle store. store[index] returns a
+    board, and record() and records() return zero-copy views of the raw
+    records for handing to workers.
+
+    """
+    def __init__(self, path):
+        self.path = path
+        self.f_in = open(path, 'rb')
+        try:
+            self.map = mmap.mmap(self.f_in.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.f_in.close()
+            raise ValueError('{} is not a puzzle store'.format(path))
+        if len(self.map) < HEADER.size:
+            self.close()
+            raise ValueError('{} is not a puzzle store'.format(path))
+        magic, version, packing, record_size, count = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or RECORD_SIZES.get(packing) != record_size:
+            self.close()
+            raise ValueError('{} is not a puzzle store'.format(path))
+        if len(self.map) < HEADER.size + count * record_size:
+            self.close()
+            raise ValueError('{} is truncated'.format(path))
+        self.packing = packing
+        self.record_size = record_size
+        self.count = count
+        self.view = memoryview(self.map)
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        return unpack_record(self.record(index), self.packing)
+
+    def __iter__(self):
+        for index in range(self.count):
+            yield self[index]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def record(self, index):
+        """Return a view of the raw record of the puzzle at index."""
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError('puzzle index out of range')
+        offset = HEADER.size + index * self.record_size
+        return self.view[offset:offset + self.record_size]
+
+    def records(self, start, stop):
+        """Return a view of the raw records of puzzles start to stop-1."""
+        start = max(0, start)
+        stop = min(self.count, stop)
+        offset = HEADER.size + start * self.record_size
+        return self.view[offset:offset + max(0, stop - start) * self.record_size]
+
+    def close(self):
+        """Release the memory map and the file."""
+        if getattr(self, 'view', None) is not None:
+            self.view.release()
+            self.view = None
+        self.map.close()
+        self.f_in.close()
+
+
+def random_puzzle(path='puzzles.txt'):
+    """
+    Return a (index, board) pair picked at random from a puzzle file.
+    A store is read directly by index. For a text file, a store at the
+    default path next to it is used when it is up to date, and
+    otherwise the text file is scanned once.
+
+    """
+    if not is_store(path):
+        store_path = store_path_for(path)
+        if (os.path.exists(store_path)
+                and os.path.getmtime(store_path) >= os.path.getmtime(path)):
+            path = store_path
+    if is_store(path):
+        with PuzzleStore(path) as store:
+            if not len(store):
+                raise ValueError('{} has no puzzles'.format(path))
+            index = random.randrange(len(store))
+            return index, store[index]
+
+    # Reservoir sampling keeps one puzzle in memory at a time.
+    chosen = None
+    for count, board in enumerate(read_puzzles(path)):
+        if random.randrange(count + 1) == 0:
+            chosen = (count, board)
+    if chosen is None:
+        raise ValueError('{} has no puzzles'.format(path))
+    return chosen
+
+def main():
+    """Convert a text puzzle file into a store."""
+    # Imported here because it takes most of the time of importing this
+    # module, and only the command line needs it.
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Convert a puzzle file into a binary store.')
+    parser.add_argument('source', nargs='?', default='puzzles.txt',
+                        help="text puzzle file, or '-' for stdin (default: puzzles.txt)")
+    parser.add_argument('dest', nargs='?', default=None,
+                        help='store to write (default: the source with an .sdk extension)')
+    parser.add_argument('--packed', action='store_true',
+                        help='pack two cells per byte (41 bytes per puzzle)')
+    args = parser.parse_args()
+
+    if args.dest is None and args.source == '-':
+        parser.error("a store path is required when reading from '-'")
+    count = convert(args.source, args.dest, args.packed)
+    print('Wrote {} puzzles to {}'.format(count, args.dest or store_path_for(args.source)))
+
+if __name__ == '__main__':
+    main()
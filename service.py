@@ -0,0 +1,489 @@
+"""
+A local solve service, for programs that want solutions without
+running a GUI. It speaks plain HTTP on a TCP port or a Unix socket:
+
+- POST /solve with a JSON body {"puzzle": "...", "timeout": 2.0}, the
+  puzzle as one line of 16, 81, 256, or 625 characters ('0' or '.' for
+  an empty cell) and the timeout optional, answers {"status": "solved",
+  "solution": "..."} or {"status": "unsolvable"}. Malformed requests
+  get 400, a full queue gets 503, and a missed deadline gets 504.
+- GET /stats answers the queue depth, request counts, a latency
+  histogram, and the cache hit rate.
+
+Solves run in a pool of worker processes, fed from a bounded queue by
+one task per worker. A request for a puzzle that is already queued or
+being solved waits for that solve instead of starting another, unless
+the solve runs out of the time an earlier request gave it. A request
+is refused right away when the queue is full, rather than waiting
+behind work it cannot get ahead of. Every request has a deadline. It
+covers the wait in the queue and the solve itself, which is given the
+time left as its timeout. Solutions of 9x9 puzzles are kept in a
+SolutionCache, so a puzzle seen before, even relabeled or shuffled, is
+answered without a solve.
+
+The --client mode sends every puzzle of a file to a running service
+and prints the results and the service's stats.
+
+Usage: python service.py [--host HOST] [--port N | --unix PATH]
+                         [--workers N] [--queue-size N]
+                         [--timeout SECONDS] [--strategy row|mrv]
+       python service.py --client [puzzle_file] [--port N | --unix PATH]
+                         [--concurrency N]
+
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import percentile
+from cache import SolutionCache
+from puzzle_io import LINE_LENGTHS, bad_chars, parse_cells, read_puzzles
+from sudoku import STRATEGIES, SolveTimeout, solve
+
+
+DEFAULT_PORT = 8081
+# Seconds a request may take when it does not ask for a deadline, and
+# the longest it may ask for.
+DEFAULT_TIMEOUT = 5.0
+MAX_TIMEOUT = 60.0
+# Upper bounds in milliseconds of the latency histogram buckets.
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+# Latencies kept for the percentiles of the stats.
+RECENT_LATENCIES = 10000
+# Largest request body read, in bytes.
+MAX_BODY = 64 * 1024
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+           413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable',
+           504: 'Gateway Timeout'}
+
+
+class Overloaded(Exception):
+    """Raised when the queue of a SolveService is full."""
+
+
+class Job():
+    """
+    A puzzle waiting for or being solved. Every request for the same
+    puzzle shares its future, and the deadline is the latest of their
+    deadlines.
+
+    """
+    def __init__(self, key, size, deadline, future):
+        self.key = key
+        self.size = size
+        self.deadline = deadline
+        self.future = future
+        self.waiters = 0
+
+
+def parse_puzzle(text):
+    """
+    Return the board of a one-line puzzle, raising ValueError if the
+    text is not one.
+
+    """
+    text = text.strip()
+    size = LINE_LENGTHS.get(len(text))
+    if size is None:
+        raise ValueError('expected a one-line puzzle of {} characters'.format(
+            ', '.join(str(length) for length in sorted(LINE_LENGTHS))))
+    bad = bad_chars(text, size)
+    if bad:
+        raise ValueError('unexpected characters {}'.format(''.join(bad)))
+    cells = parse_cells(text)
+    return [cells[i*size:(i + 1)*size] for i in range(size)]
+
+def check_timeout(timeout):
+    """
+    Return a requested timeout in seconds as a float, raising
+    ValueError unless it is a finite number above zero.
+
+    """
+    timeout = float(timeout)
+    if not math.isfinite(timeout) or timeout <= 0:
+        raise ValueError('timeout must be a positive number of seconds')
+    return timeout
+
+def solve_key(key, size, timeout, strategy):
+    """
+    Solve a puzzle given as a line of cells with ' ' for empty cells,
+    inside a worker process. Returns (status, solution), the status
+    being 'solved', 'unsolvable', or 'timeout'.
+
+    """
+    board = [list(key[i*size:(i + 1)*size]) for i in range(size)]
+    try:
+        solution = solve(board, strategy=strategy, timeout=timeout)
+    except SolveTimeout:
+        return 'timeout', None
+    if solution is None:
+        return 'unsolvable', None
+    return 'solved', ''.join(''.join(row) for row in solution)
+
+
+class SolveService():
+    """
+    The solver behind the service: a process pool, the bounded queue
+    that feeds it, the jobs in flight by puzzle, the solution cache,
+    and the counters reported by stats(). Call start() from inside the
+    event loop before solving, and close() when done.
+
+    """
+    def __init__(self, workers=None, queue_size=256, timeout=DEFAULT_TIMEOUT, strategy='mrv',
+                 cache_capacity=100000):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.strategy = strategy
+        self.cache = SolutionCache(cache_capacity)
+        self.pool = None
+        self.queue = None
+        self.feeders = []
+        # The jobs queued or being solved, by puzzle.
+        self.jobs = {}
+        self.counts = {'requests': 0, 'solved': 0, 'unsolvable': 0, 'coalesced': 0,
+                       'rejected': 0, 'timeout': 0, 'expired_in_queue': 0}
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+        self.latencies = deque(maxlen=RECENT_LATENCIES)
+        self.busy = 0
+
+    async def start(self):
+        """Start the worker processes and the tasks that feed them."""
+        self.pool = ProcessPoolExecutor(self.workers)
+        # The workers are started now, before any connection is open,
+        # or forked workers would hold the client sockets open.
+        await asyncio.get_running_loop().run_in_executor(self.pool, os.getpid)
+        self.queue = asyncio.Queue(self.queue_size)
+        self.feeders = [asyncio.create_task(self.feed()) for _ in range(self.workers)]
+
+    async def close(self):
+        """Stop feeding the workers and shut the pool down."""
+        for feeder in self.feeders:
+            feeder.cancel()
+        await asyncio.gather(*self.feeders, return_exceptions=True)
+        self.pool.shutdown(cancel_futures=True)
+
+    async def solve(self, board, timeout=None):
+        """
+        Solve a board within timeout seconds (the service's timeout by
+        default) and return (status, solution), with the solution as a
+        line of cells. The status is 'solved', 'unsolvable', or
+        'timeout'. Raises Overloaded if the queue is full, and
+        ValueError for a timeout that is not a positive number.
+
+        """
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        timeout = min(self.timeout if timeout is None else check_timeout(timeout), MAX_TIMEOUT)
+        deadline = start + timeout
+        self.counts['requests'] += 1
+        try:
+            status, solution = await self.lookup(board, deadline, loop)
+        except Overloaded:
+            self.counts['rejected'] += 1
+            raise
+        self.counts[status] += 1
+        self.record(loop.time() - start)
+        return status, solution
+
+    async def lookup(self, board, deadline, loop):
+        """
+        Answer from the cache, or join or queue the job for the board.
+        A job joined while it was being solved may run out of the time
+        an earlier request gave it, so a request whose own deadline has
+        not passed then tries again with a job of its own.
+
+        """
+        size = len(board)
+        if size == 9:
+            found, solution = self.cache.get(board)
+            if found:
+                if solution is None:
+                    return 'unsolvable', None
+                return 'solved', ''.join(''.join(row) for row in solution)
+
+        key = ''.join(''.join(row) for row in board)
+        while True:
+            status, solution = await self.wait_for_job(key, size, deadline, loop)
+            if status != 'timeout' or loop.time() >= deadline:
+                return status, solution
+
+    async def wait_for_job(self, key, size, deadline, loop):
+        """Join or queue the job for a puzzle and wait for its result until the deadline."""
+        job = self.jobs.get(key)
+        if job is not None:
+            self.counts['coalesced'] += 1
+            job.deadline = max(job.deadline, deadline)
+        else:
+            job = Job(key, size, deadline, loop.create_future())
+            try:
+                self.queue.put_nowait(job)
+            except asyncio.QueueFull:
+                raise Overloaded() from None
+            self.jobs[key] = job
+
+        job.waiters += 1
+        try:
+            # Shielded, so one request giving up does not cancel the
+            # solve for the others.
+            status, solution = await asyncio.wait_for(asyncio.shield(job.future),
+                                                      max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            return 'timeout', None
+        finally:
+            job.waiters -= 1
+        return status, solution
+
+    async def feed(self):
+        """Take jobs off the queue and solve them in the pool, one at a time."""
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self.queue.get()
+            try:
+                remaining = job.deadline - loop.time()
+                if remaining <= 0:
+                    # Every request for it has already timed out.
+                    self.counts['expired_in_queue'] += 1
+                    result = ('timeout', None)
+                else:
+                    self.busy += 1
+                    try:
+                        result = await loop.run_in_executor(
+                            self.pool, solve_key, job.key, job.size, remaining, self.strategy)
+                    finally:
+                        self.busy -= 1
+                    status, solution = result
+                    if job.size == 9 and status != 'timeout':
+                        board = [list(job.key[i*9:i*9 + 9]) for i in range(9)]
+                        self.cache.put(board, [list(solution[i*9:i*9 + 9]) for i in range(9)]
+                                       if solution else None)
+            except Exception as error:
+                self.jobs.pop(job.key, None)
+                job.future.set_exception(error)
+                # Retrieved here, so an error no request waited for is
+                # not reported as never retrieved.
+                job.future.exception()
+            else:
+                self.jobs.pop(job.key, None)
+                job.future.set_result(result)
+            finally:
+                self.queue.task_done()
+
+    def record(self, latency):
+        """Add a request latency in seconds to the histogram."""
+        self.latencies.append(latency)
+        millis = latency * 1000
+        for k, bound in enumerate(HISTOGRAM_BUCKETS):
+            if millis <= bound:
+                self.histogram[k] += 1
+                return
+        self.histogram[-1] += 1
+
+    def stats(self):
+        """Return the queue depth, counters, latencies, and cache use as a dict."""
+        latencies = sorted(self.latencies)
+        buckets = ['<={}ms'.format(bound) for bound in HISTOGRAM_BUCKETS]
+        buckets.append('>{}ms'.format(HISTOGRAM_BUCKETS[-1]))
+        return {
+            'queue_depth': self.queue.qsize() if self.queue is not None else 0,
+            'queue_size': self.queue_size,
+            'in_flight': len(self.jobs),
+            'busy_workers': self.busy,
+            'workers': self.workers,
+            'counts': dict(self.counts),
+            'latency_histogram': dict(zip(buckets, self.histogram)),
+            'latency_ms': {name: round(percentile(latencies, fraction) * 1000, 3)
+                           for name, fraction in (('p50', 0.50), ('p90', 0.90),
+                                                  ('p99', 0.99))},
+            'cache': {'hits': self.cache.hits, 'misses': self.cache.misses,
+                      'hit_rate': round(self.cache.hit_rate(), 4),
+                      'entries': len(self.cache)},
+        }
+
+    async def handle(self, reader, writer):
+        """Answer one HTTP request on a connection and close it."""
+        try:
+            code, payload = await self.respond(reader)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+            return
+        body = json.dumps(payload).encode()
+        head = ['HTTP/1.1 {} {}'.format(code, REASONS[code]),
+                'Content-Type: application/json',
+                'Content-Length: {}'.format(len(body)),
+                'Connection: close']
+        if code == 503:
+            head.append('Retry-After: 1')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + body)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, reader):
+        """Read a request and return its (status code, JSON payload)."""
+        request_line = (await reader.readline()).decode('latin-1').split()
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        if len(request_line) != 3:
+            return 400, {'error': 'malformed request line'}
+        method, path, _ = request_line
+
+        if path == '/stats':
+            if method != 'GET':
+                return 405, {'error': 'use GET for /stats'}
+            return 200, self.stats()
+        if path != '/solve':
+            return 404, {'error': 'unknown path {}'.format(path)}
+        if method != 'POST':
+            return 405, {'error': 'use POST for /solve'}
+
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            return 400, {'error': 'bad Content-Length'}
+        if length > MAX_BODY:
+            return 413, {'error': 'request body over {} bytes'.format(MAX_BODY)}
+        try:
+            request = json.loads(await reader.readexactly(length))
+            board = parse_puzzle(request['puzzle'])
+            timeout = request.get('timeout')
+            if timeout is not None:
+                timeout = check_timeout(timeout)
+        except (ValueError, KeyError, TypeError, AttributeError) as error:
+            return 400, {'error': str(error) or 'missing puzzle'}
+
+        try:
+            status, solution = await self.solve(board, timeout)
+        except Overloaded:
+            return 503, {'status': 'overloaded'}
+        except Exception as error:
+            return 500, {'error': repr(error)}
+        if status == 'timeout':
+            return 504, {'status': 'timeout'}
+        if status == 'unsolvable':
+            return 200, {'status': 'unsolvable'}
+        return 200, {'status': 'solved', 'solution': solution}
+
+
+async def serve(service, host='127.0.0.1', port=DEFAULT_PORT, unix=None):
+    """Run the service on a TCP port, or a Unix socket if unix is given, until cancelled."""
+    await service.start()
+    try:
+        if unix is not None:
+            server = await asyncio.start_unix_server(service.handle, unix)
+        else:
+            server = await asyncio.start_server(service.handle, host, port)
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.close()
+
+async def request(method, path, payload=None, host='127.0.0.1', port=DEFAULT_PORT, unix=None):
+    """
+    Send one request to a running service and return its (status code,
+    JSON payload).
+
+    """
+    if unix is not None:
+        reader, writer = await asyncio.open_unix_connection(unix)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    body = b'' if payload is None else json.dumps(payload).encode()
+    head = '{} {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n' \
+           'Content-Length: {}\r\nConnection: close\r\n\r\n'.format(method, path, host, len(body))
+    writer.write(head.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b'\r\n\r\n')
+    code = int(head.split()[1])
+    return code, json.loads(body)
+
+async def run_client(path, concurrency=32, timeout=None, **address):
+    """
+    Send every puzzle of a file to a running service, at most
+    concurrency at a time, and return a dict of how many got each
+    status along with the service's stats afterwards.
+
+    """
+    limit = asyncio.Semaphore(concurrency)
+    counts = {}
+
+    async def send(board):
+        line = ''.join(''.join(row) for row in board).replace(' ', '.')
+        payload = {'puzzle': line}
+        if timeout is not None:
+            payload['timeout'] = timeout
+        async with limit:
+            _, answer = await request('POST', '/solve', payload, **address)
+        status = answer.get('status', 'error')
+        counts[status] = counts.get(status, 0) + 1
+
+    await asyncio.gather(*(send(board) for board in read_puzzles(path)))
+    _, stats = await request('GET', '/stats', **address)
+    return counts, stats
+
+def main():
+    """Run the service, or send a puzzle file to a running one with --client."""
+    parser = argparse.ArgumentParser(description='Serve Sudoku solves over local HTTP.')
+    parser.add_argument('path', nargs='?', default='puzzles.txt',
+                        help='puzzle file sent in --client mode (default: puzzles.txt)')
+    parser.add_argument('--client', action='store_true',
+                        help='send the puzzle file to a running service instead')
+    parser.add_argument('--host', default='127.0.0.1',
+                        help='address to listen on or connect to (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help='TCP port (default: {})'.format(DEFAULT_PORT))
+    parser.add_argument('--unix', default=None,
+                        help='Unix socket path to use instead of a TCP port')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--queue-size', type=int, default=256,
+                        help='puzzles that may wait for a worker before requests '
+                             'are refused (default: 256)')
+    parser.add_argument('--timeout', type=float, default=None,
+                        help='seconds allowed per request (default: {})'.format(DEFAULT_TIMEOUT))
+    parser.add_argument('--strategy', choices=STRATEGIES, default='mrv',
+                        help='search order (default: mrv)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                        help='requests in flight at once in --client mode (default: 32)')
+    args = parser.parse_args()
+
+    if args.client:
+        start = time.perf_counter()
+        counts, stats = asyncio.run(run_client(args.path, args.concurrency, args.timeout,
+                                               host=args.host, port=args.port, unix=args.unix))
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        print('Sent {} puzzles in {:.3f}s ({:.1f} puzzles/s)'.format(
+            total, elapsed, total / elapsed if elapsed else 0.0))
+        print(', '.join('{}: {}'.format(status, count) for status, count in counts.items()))
+        print(json.dumps(stats, indent=2))
+        return
+
+    service = SolveService(args.workers, args.queue_size,
+                           DEFAULT_TIMEOUT if args.timeout is None else args.timeout,
+                           args.strategy)
+    where = args.unix or '{}:{}'.format(args.host, args.port)
+    print('Serving solves on {} with {} workers'.format(where, service.workers))
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
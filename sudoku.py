@@ -0,0 +1,945 @@
+"""
+Headless Sudoku engine. This module holds the board bookkeeping and the
+backtracking algorithm from fast_main.py without any GUI dependency, so
+puzzles can be solved on machines without a display. The GUI can watch
+a solve by passing an observer to solve().
+
+Usage: python sudoku.py [puzzle_file] [--strategy row|mrv]
+                        [--backend search|dlx|flat] [--stats]
+
+"""
+import math
+import random
+import time
+from collections import deque
+
+from puzzle_io import SIZES, SYMBOLS, read_puzzles
+
+
+SET_1_TO_9 = {'1', '2', '3', '4', '5', '6', '7', '8', '9'}
+# Cell values are stored as ints, with 0 for an empty cell. DIGITS maps
+# them back to the one-character strings used by the boards.
+DIGITS = ' 123456789'
+ALL_MASK = 0x1FF
+# The number of set bits in every 9-bit mask.
+POPCOUNT = tuple(bin(mask).count('1') for mask in range(ALL_MASK + 1))
+
+STRATEGIES = ('row', 'mrv')
+TIE_BREAKS = ('first', 'degree', 'random')
+# 'search' is the Solver of this module, 'dlx' the exact cover solver
+# of dlx.py, and 'flat' the preallocated search core of flat.py.
+BACKENDS = ('search', 'dlx', 'flat')
+
+
+class Geometry():
+    """
+    The static tables of one board size, computed once per size. A
+    board of box size n has n*n rows, columns, and n x n subgrids of
+    n*n cells each, numbered in row-major order. Units 0 to size-1 are
+    the rows, the next size units the columns, and the last size units
+    the subgrids. Cell values are ints from 1 to size, shown with the
+    first size characters of SYMBOLS.
+
+    """
+    def __init__(self, box):
+        size = box * box
+        self.box = box
+        self.size = size
+        self.num_cells = size * size
+        self.all_mask = (1 << size) - 1
+        self.digits = ' ' + SYMBOLS[:size]
+        # The int value of each one-character cell value.
+        self.values = {val: num for num, val in enumerate(self.digits)}
+        self.symbol_set = set(SYMBOLS[:size])
+
+        cells = range(self.num_cells)
+        self.row_of = tuple(index // size for index in cells)
+        self.col_of = tuple(index % size for index in cells)
+        self.box_of = tuple((index // (size*box)) * box + (index % size) // box
+                            for index in cells)
+        boxes = [[] for _ in range(size)]
+        for index in cells:
+            boxes[self.box_of[index]].append(index)
+        self.units = (tuple(tuple(row*size + col for col in range(size)) for row in range(size))
+                      + tuple(tuple(row*size + col for row in range(size))
+                              for col in range(size))
+                      + tuple(tuple(box_cells) for box_cells in boxes))
+        self.units_of = tuple((self.row_of[index], size + self.col_of[index],
+                               2*size + self.box_of[index]) for index in cells)
+        self.peers = tuple(tuple(sorted(set(self.units[row] + self.units[col]
+                                            + self.units[box_unit]) - {index}))
+                           for index, (row, col, box_unit) in enumerate(self.units_of))
+        # A lookup table is only worth building for the smaller boards.
+        if size <= 9:
+            self.popcount = tuple(bin(mask).count('1')
+                                  for mask in range(self.all_mask + 1)).__getitem__
+        else:
+            self.popcount = lambda mask: bin(mask).count('1')
+
+geometries = {}
+
+def geometry(box=3):
+    """Return the Geometry of a box size, building it on first use."""
+    if box not in geometries:
+        if box * box not in SIZES:
+            raise ValueError('Unsupported box size {}'.format(box))
+        geometries[box] = Geometry(box)
+    return geometries[box]
+
+def geometry_for(board):
+    """Return the Geometry of a board given as a list of rows."""
+    size = len(board)
+    box = math.isqrt(size)
+    if box * box != size or size not in SIZES:
+        raise ValueError('Unsupported board size {}'.format(size))
+    return geometry(box)
+
+# The standard 9x9 geometry. Cells are numbered 0-80 in row-major
+# order. Units 0-8 are the rows, 9-17 the columns, and 18-26 the 3x3
+# subgrids.
+STANDARD = geometry(3)
+ROW_OF = STANDARD.row_of
+COL_OF = STANDARD.col_of
+BOX_OF = STANDARD.box_of
+UNITS = STANDARD.units
+# The row, column, and subgrid unit ids of each cell.
+UNITS_OF = STANDARD.units_of
+# The 20 other cells that share a row, column, or subgrid with each cell.
+PEERS = STANDARD.peers
+
+
+def load_puzzles(path='puzzles.txt'):
+    """Read every puzzle in the given file into a list."""
+    return list(read_puzzles(path))
+
+def mask_to_set(mask, digits=DIGITS):
+    """Convert a mask of numbers into a set of one-character strings."""
+    return {digits[n] for n in range(1, len(digits)) if mask & (1 << (n - 1))}
+
+def flatten(board):
+    """Flatten a board of rows into a list of its cells."""
+    return [val for row in board for val in row]
+
+def create_rotated_board(board):
+    """
+    Generate the rotated Sudoku board. This is used to easily check if
+    the columns contain any duplicates.
+
+    """
+    geo = geometry_for(board)
+    cells = flatten(board)
+    return [[cells[index] for index in geo.units[geo.size + col]] for col in range(geo.size)]
+
+def create_subgrids_to_rows_board(board):
+    """
+    Generate the subgridded Sudoku board, which maps the subgrids to
+    rows. This is used to easily check if the subgrids contain any
+    duplicates.
+
+    """
+    geo = geometry_for(board)
+    cells = flatten(board)
+    return [[cells[index] for index in geo.units[2*geo.size + box]] for box in range(geo.size)]
+
+def check_units(cells, units, valid_set=SET_1_TO_9):
+    """Verify that each of the given units of a flat board contains every value."""
+    for unit in units:
+        if {cells[index] for index in unit} != valid_set:
+            return False
+    return True
+
+def check_solution(board):
+    """Verify that each row, column, and subgrid contains every value."""
+    geo = geometry_for(board)
+    return check_units(flatten(board), geo.units, geo.symbol_set)
+
+def check_rows(board):
+    """Verify that each row of the given board contains every value."""
+    geo = geometry_for(board)
+    return check_units(flatten(board), geo.units[:geo.size], geo.symbol_set)
+
+def check_violations(board):
+    """
+    Ensure that no row, column, or subgrid contains any duplicate
+    values. Returns True if there are no violations.
+
+    """
+    cells = flatten(board)
+    for unit in geometry_for(board).units:
+        values = [cells[index] for index in unit if cells[index] != ' ']
+        if len(set(values)) != len(values):
+            return False
+    return True
+
+class Sudoku():
+    """
+    A class that holds the state of a Sudoku board in a compact form:
+    a flat list of the cell values (0 for an empty cell) plus one mask
+    per row, per column, and per subgrid recording the numbers already
+    used there. Bit n-1 stands for the number n, so the valid numbers
+    for a cell are found with a single OR and a placement is three bit
+    flips. The board may be any size in SIZES (9 rows of 9 by default),
+    and the tables of its size are kept in self.geometry.
+
+    The original, rotated, and subgridded list-of-lists boards are
+    still available as read-only views.
+
+    """
+    def __init__(self, board):
+        geo = self.geometry = geometry_for(board)
+        self.size = geo.size
+        self.row_of = geo.row_of
+        self.col_of = geo.col_of
+        self.box_of = geo.box_of
+        self.all_mask = geo.all_mask
+        self.cells = [0] * geo.num_cells
+        self.row_masks = [0] * geo.size
+        self.col_masks = [0] * geo.size
+        self.box_masks = [0] * geo.size
+        # Per-cell mask of the numbers already tried by the search. A
+        # 'given' cell has no entry to try and is marked in self.given.
+        self.tried = [0] * geo.num_cells
+        self.given = [False] * geo.num_cells
+        # Cells filled by propagation during the search, in the order
+        # they were filled, and the length of this trail at the time
+        # each searched cell was last filled. Undoing a searched cell
+        # pops the trail back to its mark.
+        self.trail = []
+        self.marks = [0] * geo.num_cells
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val != ' ':
+                    self.place(i*geo.size + j, geo.values[val])
+                    self.given[i*geo.size + j] = True
+
+    @property
+    def game_board(self):
+        """The board as rows of one-character strings."""
+        size = self.size
+        digits = self.geometry.digits
+        return [[digits[self.cells[i*size + j]] for j in range(size)] for i in range(size)]
+
+    @property
+    def rotated_board(self):
+        """The board with its columns mapped to rows."""
+        return create_rotated_board(self.game_board)
+
+    @property
+    def subgrid_board(self):
+        """The board with its subgrids mapped to rows."""
+        return create_subgrids_to_rows_board(self.game_board)
+
+    def place(self, index, num):
+        """Write a number into the cell and mark it used in its units."""
+        bit = 1 << (num - 1)
+        self.cells[index] = num
+        self.row_masks[self.row_of[index]] |= bit
+        self.col_masks[self.col_of[index]] |= bit
+        self.box_masks[self.box_of[index]] |= bit
+
+    def clear(self, index):
+        """Empty the cell and release its number from its units."""
+        bit = 1 << (self.cells[index] - 1)
+        self.cells[index] = 0
+        self.row_masks[self.row_of[index]] ^= bit
+        self.col_masks[self.col_of[index]] ^= bit
+        self.box_masks[self.box_of[index]] ^= bit
+
+    def candidates(self, index):
+        """Return the mask of numbers that are valid for the cell."""
+        used = (self.row_masks[self.row_of[index]]
+                | self.col_masks[self.col_of[index]]
+                | self.box_masks[self.box_of[index]]
+                | self.tried[index])
+        return self.all_mask & ~used
+
+    def cell_value(self, i, j):
+        """Return the cell value at the given location."""
+        return self.geometry.digits[self.cells[i*self.size + j]]
+
+    def check(self, i, j):
+        """Return a set of the numbers that are valid for a given cell."""
+        return mask_to_set(self.candidates(i*self.size + j), self.geometry.digits)
+
+    def reset_cell(self, i, j):
+        """Reset the numbers tried and empty the cell."""
+        index = i*self.size + j
+        if not self.given[index]:
+            self.tried[index] = 0
+            if self.cells[index]:
+                self.clear(index)
+
+    def insert(self, i, j, val):
+        """
+        Insert the given value into the given cell and add the value to the
+        numbers tried for that cell.
+
+        """
+        index = i*self.size + j
+        if self.cells[index]:
+            self.clear(index)
+        if val != ' ':
+            num = self.geometry.values[val]
+            self.place(index, num)
+            self.tried[index] |= 1 << (num - 1)
+
+    def print_board(self, board):
+        """Print the Sudoku board."""
+        print('\n')
+        for row in board:
+            print(row)
+
+
+def move(i, j, direction, size=9):
+    """
+    Move forward ('f') or backward ('b') by one cell of a board with
+    size rows. Returns (size, size) once the search walks off either
+    end of the board.
+
+    """
+    if direction == 'f':
+        if j < size - 1:
+            j += 1
+        elif i < size - 1:
+            j = 0
+            i += 1
+        else:
+            return size, size
+    else:
+        if j > 0:
+            j -= 1
+        elif i > 0:
+            i -= 1
+            j = size - 1
+        else:
+            return size, size
+    return i, j
+
+class Instrumentation():
+    """
+    Counters, phase timings, and an event stream for a solve. Pass one
+    to solve() to watch it; without one the solver skips all of this.
+
+    The counters are nodes (values tried by the search), backtracks
+    (values taken back), naked_singles and hidden_singles (cells filled
+    by each propagation rule), propagations (calls to propagate()),
+    contradictions, and max_depth (the deepest the search went). The
+    propagation_time and search_time attributes hold the seconds spent
+    in propagation and in the rest of the search.
+
+    Subscribers are called as subscriber(event, i, j, val) for every
+    'place' and 'remove' of a cell value, and with 'contradiction' when
+    placing val at (i, j) turns out to leave a cell or unit with no
+    valid numbers.
+
+    """
+    COUNTERS = ('nodes', 'backtracks', 'naked_singles', 'hidden_singles',
+                'propagations', 'contradictions', 'max_depth')
+
+    def __init__(self):
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.propagation_time = 0.0
+        self.search_time = 0.0
+        self.subscribers = []
+        # The geometry of the board being solved, set by the Solver.
+        self.geometry = STANDARD
+
+    def subscribe(self, subscriber):
+        """Add a subscriber to the event stream."""
+        self.subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber):
+        """Remove a subscriber from the event stream."""
+        self.subscribers.remove(subscriber)
+
+    def emit(self, event, index, num):
+        """Send an event about a cell to every subscriber."""
+        geo = self.geometry
+        for subscriber in self.subscribers:
+            subscriber(event, geo.row_of[index], geo.col_of[index], geo.digits[num])
+
+    def as_dict(self):
+        """Return the counters and timings as a dict."""
+        result = {name: getattr(self, name) for name in self.COUNTERS}
+        result['propagation_time'] = self.propagation_time
+        result['search_time'] = self.search_time
+        return result
+
+    def add_to(self, stats):
+        """Add the counters into a stats dict, keeping the deepest depth."""
+        for name in self.COUNTERS:
+            if name == 'max_depth':
+                stats[name] = max(stats.get(name, 0), self.max_depth)
+            else:
+                stats[name] = stats.get(name, 0) + getattr(self, name)
+
+
+def propagate(my_board, changed, units, instrument=None):
+    """
+    Fill every cell that is forced by the cells in changed, using a work
+    queue of cells whose valid numbers may have shrunk (naked singles)
+    and of units that may now have only one place for a number (hidden
+    singles). Every cell filled here is pushed onto the board's trail.
+    Returns False as soon as a contradiction is found: a cell with no
+    valid numbers, or a unit with no place left for a number.
+
+    """
+    if instrument is not None:
+        instrument.propagations += 1
+        start = time.perf_counter()
+        try:
+            return fill_forced(my_board, changed, units, instrument)
+        finally:
+            instrument.propagation_time += time.perf_counter() - start
+    return fill_forced(my_board, changed, units, None)
+
+def fill_forced(my_board, changed, units, instrument):
+    """The work queue loop of propagate()."""
+    cells = my_board.cells
+    geo = my_board.geometry
+    peers = geo.peers
+    units_of = geo.units_of
+    all_units = geo.units
+    all_mask = geo.all_mask
+    queue = deque(changed)
+    dirty_units = set(units)
+
+    def fill(index, num, rule):
+        my_board.place(index, num)
+        my_board.trail.append(index)
+        queue.extend(peers[index])
+        dirty_units.update(units_of[index])
+        for peer in peers[index]:
+            dirty_units.update(units_of[peer])
+        if instrument is not None:
+            setattr(instrument, rule, getattr(instrument, rule) + 1)
+            instrument.emit('place', index, num)
+
+    while queue or dirty_units:
+        # Naked singles: a cell with exactly one valid number.
+        while queue:
+            index = queue.popleft()
+            if cells[index]:
+                continue
+            mask = my_board.candidates(index)
+            if not mask:
+                return False
+            # A mask with a single bit set has only one valid number.
+            if not mask & (mask - 1):
+                fill(index, mask.bit_length(), 'naked_singles')
+
+        # Hidden singles: a number with exactly one place in a unit.
+        while dirty_units and not queue:
+            unit = all_units[dirty_units.pop()]
+            placed = 0
+            once = 0
+            twice = 0
+            for index in unit:
+                if cells[index]:
+                    placed |= 1 << (cells[index] - 1)
+                else:
+                    mask = my_board.candidates(index)
+                    twice |= once & mask
+                    once |= mask
+            if (placed | once) != all_mask:
+                return False
+            singles = once & ~twice & ~placed
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for index in unit:
+                    if not cells[index] and my_board.candidates(index) & bit:
+                        break
+                else:
+                    return False
+                fill(index, bit.bit_length(), 'hidden_singles')
+    return True
+
+def undo(my_board, mark, instrument=None):
+    """Empty the cells filled since the given trail mark."""
+    trail = my_board.trail
+    while len(trail) > mark:
+        index = trail.pop()
+        if instrument is not None:
+            instrument.emit('remove', index, 0)
+        my_board.clear(index)
+
+def choose_cell(my_board, tie_break='first', rng=None):
+    """
+    Return the empty cell with the fewest valid numbers, or None if the
+    board is full. Ties are broken by tie_break: 'first' takes the
+    lowest cell index, 'degree' takes the cell with the most empty
+    peers, and 'random' picks one of the tied cells with rng.
+
+    """
+    cells = my_board.cells
+    geo = my_board.geometry
+    popcount = geo.popcount
+    best_count = geo.size + 1
+    tied = []
+    for index in range(geo.num_cells):
+        if cells[index]:
+            continue
+        count = popcount(my_board.candidates(index))
+        if count < best_count:
+            best_count = count
+            tied = [index]
+            # Nothing beats a cell with no choices or a single one.
+            if count <= 1 and tie_break == 'first':
+                break
+        elif count == best_count:
+            tied.append(index)
+
+    if not tied:
+        return None
+    if tie_break == 'degree':
+        return max(tied, key=lambda index: sum(1 for peer in geo.peers[index] if not cells[peer]))
+    if tie_break == 'random':
+        return rng.choice(tied)
+    return tied[0]
+
+def default_strategy(board):
+    """
+    Return the strategy used when none is given: 'row', the original
+    algorithm, for 9x9 boards, and 'mrv' for the others, on which
+    row-major search rarely finishes.
+
+    """
+    return 'row' if len(board) == 9 else 'mrv'
+
+class SolveTimeout(Exception):
+    """Raised when a solve runs past its timeout."""
+
+class NodeLimit(SolveTimeout):
+    """
+    Raised when a search tries more values than its node limit allows.
+    Like a timeout it ends a search that is taking too long, but it
+    comes at the same point of the search on every machine.
+
+    """
+
+
+class Solver():
+    """
+    The state of a single solve: the board, the search cursor and
+    direction, and the instrumentation of the caller. The module level
+    tables are never modified, so separate Solver objects share no
+    mutable state and any number of solves can run at once in
+    different threads. A single Solver must only be run by one thread.
+
+    """
+    def __init__(self, board, strategy=None, tie_break='first', seed=None, timeout=None,
+                 instrument=None, max_nodes=None):
+        if strategy is None:
+            strategy = default_strategy(board)
+        if strategy not in STRATEGIES:
+            raise ValueError('Unknown strategy {!r}'.format(strategy))
+        if tie_break not in TIE_BREAKS:
+            raise ValueError('Unknown tie break {!r}'.format(tie_break))
+
+        self.board = board
+        self.strategy = strategy
+        self.tie_break = tie_break
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.deadline = None
+        self.instrument = instrument
+        # The values tried so far, and how many may be tried before
+        # NodeLimit is raised.
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        self.my_board = None
+        self.direction = 'f'
+        self.depth = 0
+        self.solution = None
+        self.found = 0
+
+    def run(self):
+        """
+        Solve the board and return the solution, or None. Raises
+        SolveTimeout if the solve takes longer than the timeout.
+
+        """
+        if not self.prepare():
+            return None
+        return self.timed(self.search)
+
+    def count(self, limit=2):
+        """
+        Count the solutions of the board, stopping as soon as limit of
+        them have been found, and return the count. The first solution
+        found is kept as self.solution. Always searches in 'mrv' order,
+        since the order does not change the count. Raises SolveTimeout
+        if the count takes longer than the timeout.
+
+        """
+        self.solution = None
+        self.found = 0
+        if limit < 1 or not self.prepare():
+            return 0
+        self.timed(lambda: self.count_mrv(limit))
+        return self.found
+
+    def prepare(self):
+        """
+        Start the clock, build the board and fill the cells that the
+        givens force. Returns False if the givens already contradict
+        each other.
+
+        """
+        if self.timeout is not None:
+            self.deadline = time.perf_counter() + self.timeout
+        instrument = self.instrument
+
+        if not check_violations(self.board):
+            return False
+        self.my_board = my_board = Sudoku(self.board)
+        geo = my_board.geometry
+        if instrument is not None:
+            instrument.geometry = geo
+
+        # Fill the cells that the givens force, then treat them as givens.
+        if not propagate(my_board, range(geo.num_cells), range(3*geo.size), instrument):
+            if instrument is not None:
+                instrument.contradictions += 1
+            return False
+        for index in my_board.trail:
+            my_board.given[index] = True
+        my_board.trail.clear()
+        return True
+
+    def timed(self, search):
+        """Run a search, adding its time to the instrumentation."""
+        instrument = self.instrument
+        if instrument is None:
+            return search()
+        start = time.perf_counter()
+        propagation_time = instrument.propagation_time
+        try:
+            return search()
+        finally:
+            instrument.search_time += (time.perf_counter() - start
+                                       - (instrument.propagation_time - propagation_time))
+
+    def count_node(self):
+        """Count a value tried, raising NodeLimit once there are too many."""
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise NodeLimit()
+
+    def search(self):
+        """Run the search of the chosen strategy from the current board."""
+        if self.strategy == 'mrv':
+            if not self.search_mrv():
+                return None
+            return self.my_board.game_board
+
+        self.direction = 'f'
+        size = self.my_board.size
+        i = 0
+        j = 0
+        while i < size and j < size:
+            i, j = self.fill_cell(i, j)
+
+        if self.direction == 'b':
+            return None
+        return self.my_board.game_board
+
+    def fill_cell(self, i, j):
+        """
+        Fill the cell and keep moving forward if a valid value can be
+        found, propagating the consequences of that value. Otherwise,
+        keep the cell empty and move backwards. If the cell was 'given'
+        or was filled by propagation, move over it without altering its
+        value.
+
+        """
+        my_board = self.my_board
+        geo = my_board.geometry
+        instrument = self.instrument
+        index = i*my_board.size + j
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SolveTimeout()
+
+        # This cell was 'given', or was forced by an earlier cell. Just
+        # move over it.
+        if my_board.given[index] or (my_board.cells[index] and not my_board.tried[index]):
+            return move(i, j, self.direction, my_board.size)
+
+        # Take back whatever the previous value of this cell forced.
+        undo(my_board, my_board.marks[index], instrument)
+        if my_board.cells[index]:
+            if instrument is not None:
+                instrument.backtracks += 1
+                instrument.emit('remove', index, 0)
+            my_board.clear(index)
+        else:
+            self.depth += 1
+            if instrument is not None and self.depth > instrument.max_depth:
+                instrument.max_depth = self.depth
+
+        # Try the smallest number that works and whose consequences do
+        # not lead to a contradiction.
+        valid_numbers = my_board.candidates(index)
+        while valid_numbers:
+            bit = valid_numbers & -valid_numbers
+            valid_numbers ^= bit
+            num = bit.bit_length()
+            self.count_node()
+            my_board.place(index, num)
+            my_board.tried[index] |= bit
+            my_board.marks[index] = len(my_board.trail)
+            if instrument is not None:
+                instrument.nodes += 1
+                instrument.emit('place', index, num)
+            if propagate(my_board, geo.peers[index], geo.units_of[index], instrument):
+                self.direction = 'f'
+                return move(i, j, self.direction, my_board.size)
+            undo(my_board, my_board.marks[index], instrument)
+            if instrument is not None:
+                instrument.contradictions += 1
+                instrument.backtracks += 1
+                instrument.emit('contradiction', index, num)
+                instrument.emit('remove', index, 0)
+            my_board.clear(index)
+
+        self.direction = 'b'
+        self.depth -= 1
+        my_board.reset_cell(i, j)
+        return move(i, j, self.direction, my_board.size)
+
+    def search_mrv(self, depth=1):
+        """
+        Search by always branching on the empty cell with the fewest
+        valid numbers. Every cell change goes on the board's trail, so a
+        failed branch is taken back by popping the trail to where it
+        started. Returns True once the board is full.
+
+        """
+        my_board = self.my_board
+        geo = my_board.geometry
+        instrument = self.instrument
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SolveTimeout()
+        index = choose_cell(my_board, self.tie_break, self.rng)
+        if index is None:
+            return True
+        if instrument is not None and depth > instrument.max_depth:
+            instrument.max_depth = depth
+
+        valid_numbers = my_board.candidates(index)
+        while valid_numbers:
+            bit = valid_numbers & -valid_numbers
+            valid_numbers ^= bit
+            self.count_node()
+            mark = len(my_board.trail)
+            my_board.place(index, bit.bit_length())
+            my_board.trail.append(index)
+            if instrument is not None:
+                instrument.nodes += 1
+                instrument.emit('place', index, bit.bit_length())
+            if propagate(my_board, geo.peers[index], geo.units_of[index], instrument):
+                if self.search_mrv(depth + 1):
+                    return True
+            elif instrument is not None:
+                instrument.contradictions += 1
+                instrument.emit('contradiction', index, bit.bit_length())
+            undo(my_board, mark, instrument)
+            if instrument is not None:
+                instrument.backtracks += 1
+        return False
+
+    def count_mrv(self, limit, depth=1):
+        """
+        Like search_mrv(), but keep going after a full board until limit
+        solutions have been counted in self.found. Returns True once the
+        limit is reached, which cuts the rest of the search off.
+
+        """
+        my_board = self.my_board
+        geo = my_board.geometry
+        instrument = self.instrument
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SolveTimeout()
+        index = choose_cell(my_board, self.tie_break, self.rng)
+        if index is None:
+            if self.solution is None:
+                self.solution = my_board.game_board
+            self.found += 1
+            return self.found >= limit
+        if instrument is not None and depth > instrument.max_depth:
+            instrument.max_depth = depth
+
+        valid_numbers = my_board.candidates(index)
+        while valid_numbers:
+            bit = valid_numbers & -valid_numbers
+            valid_numbers ^= bit
+            self.count_node()
+            mark = len(my_board.trail)
+            my_board.place(index, bit.bit_length())
+            my_board.trail.append(index)
+            if instrument is not None:
+                instrument.nodes += 1
+                instrument.emit('place', index, bit.bit_length())
+            if propagate(my_board, geo.peers[index], geo.units_of[index], instrument):
+                if self.count_mrv(limit, depth + 1):
+                    return True
+            elif instrument is not None:
+                instrument.contradictions += 1
+                instrument.emit('contradiction', index, bit.bit_length())
+            undo(my_board, mark, instrument)
+            if instrument is not None:
+                instrument.backtracks += 1
+        return False
+
+def observer_subscriber(observer):
+    """Adapt an observer(i, j, val) callback into an event subscriber."""
+    def subscriber(event, i, j, val):
+        if event != 'contradiction':
+            observer(i, j, val)
+    return subscriber
+
+def make_solver(board, backend='search', strategy='mrv', tie_break='first', seed=None,
+                timeout=None, instrument=None, max_nodes=None):
+    """
+    Return a solver for the board from the chosen backend. Either kind
+    has solve-like run() or solve() methods and count(limit), and
+    keeps the first solution it counts as its solution attribute. With
+    max_nodes, NodeLimit is raised once the search has tried more
+    values than that.
+
+    """
+    if backend == 'search':
+        return Solver(board, strategy, tie_break, seed, timeout, instrument, max_nodes)
+    if backend == 'dlx':
+        # Imported here because dlx.py is built on this module.
+        from dlx import DancingLinks
+        return DancingLinks(board, timeout, instrument, max_nodes)
+    if backend == 'flat':
+        # Imported here because flat.py is built on this module.
+        from flat import FlatSolver
+        return FlatSolver(board, timeout, instrument, max_nodes)
+    raise ValueError('Unknown backend {!r}'.format(backend))
+
+def solve(board, observer=None, stats=None, strategy=None, tie_break='first', seed=None,
+          timeout=None, instrument=None, backend='search'):
+    """
+    Solve the given board (9 lists of 9 one-character strings, ' ' for
+    an empty cell, or any other size in SIZES) and return the solved
+    board, or None if there is no solution. The given board is not
+    modified.
+
+    To watch the solve, pass an Instrumentation as instrument. As
+    shortcuts, an observer is called as observer(i, j, val) after every
+    cell change, and the counters of the solve are added into a stats
+    dict (see Instrumentation for their names). With none of these the
+    solve pays nothing for instrumentation.
+
+    The strategy picks the search order: 'row' walks the cells in
+    row-major order like the original algorithm, and 'mrv' always
+    branches on the cell with the fewest valid numbers, breaking ties
+    as described in choose_cell(). Without one, the search is 'row' on
+    9x9 boards and 'mrv' on the others (see default_strategy()). The seed is used by the 'random'
+    tie break. If a timeout in seconds is given, SolveTimeout is
+    raised once the solve runs longer than that.
+
+    The backend picks the solver: 'search' for the Solver of this
+    module, 'dlx' for the Dancing Links exact cover solver, or 'flat'
+    for the preallocated search core. The last two ignore the
+    strategy and always branch on the most constrained choice.
+
+    Every call has its own Solver, so solve() is safe to call from many
+    threads at once as long as each call has its own stats dict and
+    instrumentation.
+
+    """
+    if instrument is None and (observer is not None or stats is not None):
+        instrument = Instrumentation()
+    if observer is not None:
+        instrument.subscribe(observer_subscriber(observer))
+    try:
+        solver = make_solver(board, backend, strategy, tie_break, seed, timeout, instrument)
+        return solver.run() if backend == 'search' else solver.solve()
+    finally:
+        if stats is not None:
+            instrument.add_to(stats)
+
+def count_solutions(board, limit=2, timeout=None, instrument=None, backend='search',
+                    max_nodes=None):
+    """
+    Return the number of solutions of the given board, counting no
+    further than limit. With the default limit of 2 the result tells a
+    puzzle with no solution (0) from a proper puzzle (1) and one with
+    several (2), and the search stops at the second solution. If a
+    timeout in seconds is given, SolveTimeout is raised once the count
+    runs longer than that, and if max_nodes is given, NodeLimit is
+    raised once it has tried more values than that, which unlike a
+    timeout does not depend on the speed of the machine. The backend is
+    as for solve().
+
+    """
+    return make_solver(board, backend, timeout=timeout, instrument=instrument,
+                       max_nodes=max_nodes).count(limit)
+
+def main():
+    """Solve every puzzle in a file and report the throughput."""
+    # Imported here because it takes most of the time of importing this
+    # module, and only the command line needs it.
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Solve Sudoku puzzles without the GUI.')
+    parser.add_argument('path', nargs='?', default='puzzles.txt',
+                        help="puzzle file to solve, or '-' for stdin (default: puzzles.txt)")
+    parser.add_argument('--strategy', choices=STRATEGIES, default='mrv',
+                        help='search order (default: mrv)')
+    parser.add_argument('--tie-break', choices=TIE_BREAKS, default='first',
+                        help='how the mrv strategy breaks ties (default: first)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the random tie break')
+    parser.add_argument('--backend', choices=BACKENDS, default='search',
+                        help='solver to use (default: search)')
+    parser.add_argument('--cache', default=None,
+                        help='solution cache file to use and update')
+    parser.add_argument('--stats', action='store_true',
+                        help='count and time the propagation and search')
+    args = parser.parse_args()
+
+    solver = solve
+    if args.cache is not None:
+        # Imported here because cache.py is built on this module.
+        from cache import SolutionCache
+        solution_cache = SolutionCache(path=args.cache)
+        solver = solution_cache.solve
+
+    num_solved = 0
+    num_failed = 0
+    # Counting every node costs time, so it is only done when asked for.
+    instrument = Instrumentation() if args.stats else None
+    start = time.perf_counter()
+    for board in read_puzzles(args.path):
+        solution = solver(board, instrument=instrument, strategy=args.strategy,
+                          tie_break=args.tie_break, seed=args.seed, backend=args.backend)
+        if solution is not None and check_solution(solution):
+            num_solved += 1
+        else:
+            num_failed += 1
+    elapsed = time.perf_counter() - start
+
+    total = num_solved + num_failed
+    print('Solved {} of {} puzzles in {:.3f}s ({:.1f} puzzles/s)'.format(
+        num_solved, total, elapsed, total / elapsed if elapsed else 0.0))
+    if instrument is not None:
+        print('Propagation filled {} naked singles and {} hidden singles in {:.3f}s'.format(
+            instrument.naked_singles, instrument.hidden_singles, instrument.propagation_time))
+        print('Search tried {} values with {} backtracks, max depth {}, in {:.3f}s'.format(
+            instrument.nodes, instrument.backtracks, instrument.max_depth, instrument.search_time))
+    if num_failed:
+        print('{} puzzles had no valid solution'.format(num_failed))
+    if args.cache is not None:
+        solution_cache.save()
+        print('Cache: {} hits, {} misses, {} entries'.format(
+            solution_cache.hits, solution_cache.misses, len(solution_cache)))
+
+if __name__ == '__main__':
+    main()
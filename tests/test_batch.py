@@ -0,0 +1,13 @@
+from batch import LatencyHistogram, percentile
+
+
+def test_histogram_percentiles_are_close():
+    latencies = [0.0] + [k * 1e-4 for k in range(1, 5000)]
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.add(latency)
+    assert histogram.total == len(latencies)
+    assert histogram.max == latencies[-1]
+    for fraction in (0.5, 0.9, 0.99):
+        exact = percentile(latencies, fraction)
+        assert exact <= histogram.percentile(fraction) <= exact * 1.03
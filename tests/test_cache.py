@@ -0,0 +1,8 @@
+import pytest
+
+from cache import SolutionCache
+
+
+def test_save_without_a_path():
+    with pytest.raises(ValueError):
+        SolutionCache().save()
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+from dlx import DancingLinks
+from puzzle_io import read_puzzles
+from sudoku import BACKENDS, check_solution, count_solutions, solve
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUZZLES = list(read_puzzles(os.path.join(ROOT, 'puzzles.txt')))
+
+
+def with_cells(board, *cells):
+    board = [row[:] for row in board]
+    for i, j, val in cells:
+        board[i][j] = val
+    return board
+
+
+def test_dlx_solves_like_the_search():
+    for board in PUZZLES[:10]:
+        solution = DancingLinks(board).solve()
+        assert check_solution(solution)
+        assert solution == solve(board, strategy='mrv')
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_unique_puzzle(backend):
+    assert count_solutions(PUZZLES[0], limit=2, backend=backend) == 1
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_stops_at_limit(backend):
+    empty = [[' '] * 4 for _ in range(4)]
+    assert count_solutions(empty, limit=5, backend=backend) == 5
+    assert count_solutions(empty, limit=1000, backend=backend) == 288
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_two_solutions(backend):
+    # Clearing a solved deadly pattern of four cells leaves two ways to
+    # fill them back in.
+    solution = solve(PUZZLES[0])
+    for i in range(9):
+        for k in range(i + 1, 9):
+            if k // 3 != i // 3:
+                continue
+            for j in range(9):
+                for l in range(9):
+                    if (l // 3 != j // 3 and solution[i][j] == solution[k][l]
+                            and solution[i][l] == solution[k][j]):
+                        board = with_cells(solution, (i, j, ' '), (i, l, ' '),
+                                           (k, j, ' '), (k, l, ' '))
+                        assert count_solutions(board, limit=5, backend=backend) == 2
+                        return
+    pytest.skip('the solution has no deadly pattern')
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_contradictions(backend):
+    # Two 5s in the first row.
+    repeated = with_cells(PUZZLES[0], (0, 0, '5'), (0, 1, '5'))
+    assert count_solutions(repeated, backend=backend) == 0
+    # A cell whose row, column, and box leave no number.
+    blocked = [[' '] * 4 for _ in range(4)]
+    blocked = with_cells(blocked, (0, 1, '1'), (0, 2, '2'), (2, 0, '3'), (1, 1, '4'))
+    assert count_solutions(blocked, backend=backend) == 0
+    assert count_solutions(PUZZLES[0], limit=0, backend=backend) == 0
@@ -0,0 +1,35 @@
+import os
+
+import pytest
+
+from puzzle_io import read_puzzles
+from sudoku import Instrumentation, SolveTimeout, check_solution, solve
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_observer_on_16x16_board():
+    board = next(read_puzzles(os.path.join(ROOT, 'corpora', 'size_16.txt')))
+    events = []
+    solution = solve(board, observer=lambda i, j, val: events.append((i, j, val)),
+                     backend='flat')
+    assert solution is not None and check_solution(solution)
+    assert events
+    assert all(0 <= i < 16 and 0 <= j < 16 for i, j, _ in events)
+
+
+def test_propagation_is_timed():
+    instrument = Instrumentation()
+    board = next(read_puzzles(os.path.join(ROOT, 'puzzles.txt')))
+    assert solve(board, instrument=instrument, backend='flat') is not None
+    assert instrument.propagations > 0
+    assert instrument.propagation_time > 0
+
+
+def test_search_time_is_kept_on_timeout():
+    instrument = Instrumentation()
+    board = list(read_puzzles(os.path.join(ROOT, 'corpora', 'size_16.txt')))[3]
+    with pytest.raises(SolveTimeout):
+        solve(board, instrument=instrument, backend='flat', timeout=0.001)
+    assert instrument.search_time > 0
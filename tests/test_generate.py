@@ -0,0 +1,24 @@
+import pytest
+
+from generate import generate_puzzle
+from sudoku import BACKENDS, NodeLimit, count_solutions
+
+
+EMPTY = [[' '] * 9 for _ in range(9)]
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_stops_at_node_limit(backend):
+    with pytest.raises(NodeLimit):
+        count_solutions(EMPTY, limit=1000, backend=backend, max_nodes=50)
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_count_within_node_limit(backend):
+    assert count_solutions(EMPTY, limit=3, backend=backend, max_nodes=1000) == 3
+
+
+def test_same_seed_gives_same_puzzle():
+    puzzle = generate_puzzle('7:0', box=2)
+    assert generate_puzzle('7:0', box=2) == puzzle
+    assert count_solutions(puzzle) == 1
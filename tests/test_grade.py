@@ -0,0 +1,9 @@
+from grade import grade
+
+
+def test_unsolvable_puzzle_left_open_is_not_graded():
+    # The first puzzle of hard.txt with a 2 added in r1c2, which leaves it
+    # no solution without any of the techniques showing it.
+    line = '82.........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..'
+    board = [list(line[i*9:i*9 + 9].replace('.', ' ')) for i in range(9)]
+    assert grade(board).technique is None
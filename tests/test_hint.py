@@ -0,0 +1,76 @@
+import os
+import random
+
+import pytest
+
+from grade import Candidates, next_deduction
+from hint import HintState, describe, play_state_for
+from play import PlayState
+from puzzle_io import read_puzzles
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUZZLES = list(read_puzzles(os.path.join(ROOT, 'puzzles.txt')))
+
+
+def fresh_masks(state):
+    return Candidates(state.game_board).masks
+
+
+def first_elimination(state):
+    """Follow the hints until one only removes candidates, and return it."""
+    while True:
+        deduction = state.hint()
+        if deduction is None or not deduction.placements:
+            return deduction
+        for index, num in deduction.placements:
+            state.set_cell(index // 9, index % 9, str(num))
+
+
+def test_masks_follow_entries():
+    rng = random.Random(7)
+    state = HintState(PUZZLES[0])
+    assert state.masks == fresh_masks(state)
+    for _ in range(300):
+        state.set_cell(rng.randrange(9), rng.randrange(9), rng.choice(' 123456789'))
+        assert state.masks == fresh_masks(state)
+
+
+def test_hint_is_the_easiest_deduction():
+    for board in PUZZLES[:5]:
+        deduction = HintState(board).hint()
+        assert deduction == next_deduction(Candidates(board))
+        assert describe(deduction)
+
+
+def test_eliminations_are_kept_until_an_entry_is_cleared():
+    state = HintState(PUZZLES[5])
+    deduction = first_elimination(state)
+    assert deduction is not None and deduction.technique == 'pointing'
+    for index, mask in deduction.eliminations:
+        assert not state.masks[index] & mask
+    # The next hint builds on the eliminations instead of repeating them.
+    assert state.hint() != deduction
+
+    # Clearing any entry forgets them.
+    filled = next(index for index, num in enumerate(state.cells) if num)
+    state.set_cell(filled // 9, filled % 9, ' ')
+    assert not state.eliminated
+    assert state.masks == fresh_masks(state)
+
+
+def test_no_hint_with_conflicts_until_fixed():
+    state = HintState(PUZZLES[0])
+    # r1c1 is empty, and the first row already holds a 3.
+    assert state.set_cell(0, 0, '3') == {0, 2}
+    assert state.hint() is None
+    state.set_cell(0, 0, ' ')
+    assert state.hint() is not None
+
+
+def test_hints_only_for_9x9():
+    board = [[' '] * 4 for _ in range(4)]
+    with pytest.raises(ValueError):
+        HintState(board)
+    assert type(play_state_for(board)) is PlayState
+    assert type(play_state_for(PUZZLES[0])) is HintState
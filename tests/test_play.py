@@ -0,0 +1,64 @@
+import os
+
+from play import PlayState
+from puzzle_io import read_puzzles
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUZZLE = next(read_puzzles(os.path.join(ROOT, 'puzzles.txt')))
+
+
+def scan_conflicts(board):
+    """Find the conflicting cells by comparing every pair of cells."""
+    size = len(board)
+    box = int(size ** 0.5)
+    conflicts = set()
+    cells = [(i, j) for i in range(size) for j in range(size) if board[i][j] != ' ']
+    for i, j in cells:
+        for k, l in cells:
+            same_unit = i == k or j == l or (i // box, j // box) == (k // box, l // box)
+            if (i, j) != (k, l) and same_unit and board[i][j] == board[k][l]:
+                conflicts.add(i*size + j)
+    return conflicts
+
+
+def test_entries_mark_and_clear_conflicts():
+    state = PlayState(PUZZLE)
+    assert not state.conflicts
+    # The first row already holds a 3 in r1c3 and a 2 in r1c5.
+    assert state.set_cell(0, 0, '3') == {0, 2}
+    assert state.conflicts == {0, 2}
+    # A second conflict with the same given only changes the new cell.
+    assert state.set_cell(0, 1, '3') == {1}
+    # Changing an entry frees a given only once no other cell repeats it.
+    assert state.set_cell(0, 0, '2') == {4}
+    assert state.conflicts == {0, 1, 2, 4}
+    assert state.set_cell(0, 1, ' ') == {1, 2}
+    assert state.set_cell(0, 0, ' ') == {0, 4}
+    assert not state.conflicts
+    assert state.set_cell(0, 0, ' ') == set()
+    assert state.game_board == PUZZLE
+
+
+def test_conflicts_match_a_full_scan():
+    state = PlayState(PUZZLE)
+    for n, (i, j) in enumerate((i, j) for i in range(9) for j in range(0, 9, 2)):
+        state.set_cell(i, j, str(n % 9 + 1))
+        assert state.conflicts == scan_conflicts(state.game_board)
+
+
+def test_conflicting_givens_and_verdicts():
+    board = [row[:] for row in PUZZLE]
+    board[8][8] = '5'
+    state = PlayState(board)
+    # r9c3 and r7c7 are given 5s.
+    assert state.conflicts == {60, 74, 80}
+    assert state.verdict() == 'unsolvable'
+    assert PlayState(PUZZLE).verdict() == 'solvable'
+    # No conflicts, but r1c1 has no number left.
+    blocked = [[' '] * 4 for _ in range(4)]
+    for i, j, val in ((0, 1, '1'), (0, 2, '2'), (2, 0, '3'), (1, 1, '4')):
+        blocked[i][j] = val
+    state = PlayState(blocked)
+    assert not state.conflicts
+    assert state.verdict() == 'unsolvable'
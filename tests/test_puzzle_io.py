@@ -0,0 +1,53 @@
+import io
+
+import pytest
+
+from puzzle_io import PuzzleFormatError, format_board, read_puzzles, write_puzzles
+
+
+GRID = ['003020600', '900305001', '001806400', '008102900', '700000008',
+        '006708200', '002609500', '800203009', '005010300']
+LINE = ''.join(GRID)
+
+
+def read(text, on_error=None):
+    return list(read_puzzles(io.StringIO(text), on_error))
+
+
+def test_reads_grids_and_lines_alike():
+    boards = read('Grid 01\n{}\n\n{}\n{}\n'.format('\n'.join(GRID), LINE, LINE.replace('0', '.')))
+    assert len(boards) == 3
+    assert boards[0] == boards[1] == boards[2]
+    assert format_board(boards[0], 'line') == LINE
+
+
+def test_write_reads_back():
+    boards = read(LINE + '\n')
+    f_out = io.StringIO()
+    write_puzzles(boards * 2, f_out)
+    assert read(f_out.getvalue()) == boards * 2
+
+
+@pytest.mark.parametrize('text, line_number, message', [
+    ('{}\n12345\n'.format(LINE), 2, "expected a 'Grid' header or a one-line puzzle"),
+    ('{}x\n'.format(LINE[:-1]), 1, "invalid characters ['x']"),
+    ('Grid 01\n{}\n'.format('\n'.join(GRID[:5])), 1, 'grid has only 5 of 9 rows'),
+    ('Grid 01\n{}\nGrid 02\n'.format('\n'.join(GRID[:3])), 1, 'grid has only 3 of 9 rows'),
+    ('Grid 01\n{}\n{}\n'.format('\n'.join(GRID[:2]), LINE), 1, 'grid has only 2 of 9 rows'),
+    ('Grid 01\n{}\n1234\n'.format('\n'.join(GRID[:8])), 10, 'expected 9 cells, got 4'),
+    ('Grid 01\n{}\n00501030x\n'.format('\n'.join(GRID[:8])), 10, "invalid characters ['x']"),
+])
+def test_malformed_records_raise(text, line_number, message):
+    with pytest.raises(PuzzleFormatError) as info:
+        read(text)
+    assert info.value.line_number == line_number
+    assert str(info.value) == 'line {}: {}'.format(line_number, message)
+
+
+def test_on_error_skips_each_bad_record_once():
+    errors = []
+    bad_grid = ['12345'] + GRID[1:8] + ['x' * 9]
+    text = '{}\nGrid 01\n{}\n12345\n{}\n'.format(LINE, '\n'.join(bad_grid), LINE)
+    boards = read(text, errors.append)
+    assert len(boards) == 2
+    assert [error.line_number for error in errors] == [3, 12]
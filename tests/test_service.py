@@ -0,0 +1,61 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import service
+from service import SolveService, parse_puzzle, solve_key
+
+
+PUZZLE = '..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9'
+# Seconds the stand-in solve takes.
+SOLVE_TIME = 0.2
+
+
+def slow_solve_key(key, size, timeout, strategy):
+    """Take SOLVE_TIME to solve, or time out if given less than that."""
+    time.sleep(min(timeout, SOLVE_TIME))
+    if timeout < SOLVE_TIME:
+        return 'timeout', None
+    return solve_key(key, size, timeout, strategy)
+
+
+async def respond(body):
+    reader = asyncio.StreamReader()
+    reader.feed_data('POST /solve HTTP/1.1\r\nContent-Length: {}\r\n\r\n'.format(
+        len(body)).encode() + body)
+    reader.feed_eof()
+    return await SolveService(workers=1).respond(reader)
+
+
+@pytest.mark.parametrize('timeout', [0, -1, float('nan'), float('inf'), 'nan', 'inf'])
+def test_bad_timeout_is_rejected(timeout):
+    body = json.dumps({'puzzle': PUZZLE, 'timeout': timeout}).encode()
+    code, payload = asyncio.run(respond(body))
+    assert code == 400
+    assert 'timeout' in payload['error']
+
+
+def test_request_joining_a_running_job_keeps_its_deadline(monkeypatch):
+    monkeypatch.setattr(service, 'solve_key', slow_solve_key)
+    # Threads, so the stand-in solve is the one the workers run.
+    monkeypatch.setattr(service, 'ProcessPoolExecutor', ThreadPoolExecutor)
+
+    async def run():
+        solver = SolveService(workers=1)
+        await solver.start()
+        try:
+            board = parse_puzzle(PUZZLE)
+            first = asyncio.create_task(solver.solve(board, SOLVE_TIME / 4))
+            await asyncio.sleep(SOLVE_TIME / 20)
+            second = asyncio.create_task(solver.solve(board, 10.0))
+            return await asyncio.gather(first, second), solver.counts
+        finally:
+            await solver.close()
+
+    (first, second), counts = asyncio.run(run())
+    assert first == ('timeout', None)
+    assert second[0] == 'solved'
+    assert counts['coalesced'] == 1
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+from puzzle_io import read_puzzles
+from sudoku import Solver, check_solution, main, solve
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def first_puzzle(name):
+    return next(read_puzzles(os.path.join(ROOT, name)))
+
+
+def test_default_strategy_by_size():
+    assert Solver(first_puzzle('puzzles.txt')).strategy == 'row'
+    assert Solver(first_puzzle(os.path.join('corpora', 'size_16.txt'))).strategy == 'mrv'
+
+
+def test_16x16_solves_without_a_strategy():
+    solution = solve(first_puzzle(os.path.join('corpora', 'size_16.txt')), timeout=10)
+    assert solution is not None and check_solution(solution)
+
+
+@pytest.mark.parametrize('stats', [False, True])
+def test_cli_prints_stats_only_when_asked(monkeypatch, capsys, stats):
+    argv = ['sudoku.py', os.path.join(ROOT, 'puzzles.txt')] + (['--stats'] if stats else [])
+    monkeypatch.setattr(sys, 'argv', argv)
+    main()
+    out = capsys.readouterr().out
+    assert out.startswith('Solved 50 of 50 puzzles')
+    assert ('Propagation filled' in out) == stats
+    assert ('Search tried' in out) == stats
@@ -0,0 +1,50 @@
+import os
+
+from puzzle_io import read_puzzles
+from sudoku import check_solution, solve
+from vector import propagate_boards, solve_many
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUZZLES = list(read_puzzles(os.path.join(ROOT, 'puzzles.txt')))
+SIZE_16 = list(read_puzzles(os.path.join(ROOT, 'corpora', 'size_16.txt')))
+
+
+def keeps_givens(board, result):
+    return all(val == ' ' or val == got
+               for row, got_row in zip(board, result) for val, got in zip(row, got_row))
+
+
+def test_propagation_keeps_givens_and_stays_consistent():
+    for board, result in zip(PUZZLES, propagate_boards(PUZZLES)):
+        assert result is not None
+        assert keeps_givens(board, result)
+        # Whatever propagation filled in is part of the solution.
+        assert keeps_givens(result, solve(board, strategy='mrv'))
+
+
+def repeated_five():
+    board = [row[:] for row in PUZZLES[0]]
+    board[0][0] = board[0][1] = '5'
+    return board
+
+
+def test_propagation_finds_dead_boards():
+    board = repeated_five()
+    blocked = [[' '] * 4 for _ in range(4)]
+    for i, j, val in ((0, 1, '1'), (0, 2, '2'), (2, 0, '3'), (1, 1, '4')):
+        blocked[i][j] = val
+    assert propagate_boards([board, PUZZLES[1], blocked])[::2] == [None, None]
+
+
+def test_solve_many_matches_solve():
+    stats = {}
+    boards = PUZZLES + SIZE_16[:2]
+    solutions = list(solve_many(boards, chunk_size=16, stats=stats))
+    assert len(solutions) == len(boards)
+    for board, solution in zip(boards, solutions):
+        assert check_solution(solution)
+        assert keeps_givens(board, solution)
+    assert stats['propagated'] + stats['searched'] == len(boards)
+    assert stats['propagated'] > 0
+    assert list(solve_many([repeated_five()])) == [None]
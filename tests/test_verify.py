@@ -0,0 +1,86 @@
+import io
+
+import pytest
+
+from puzzle_io import format_board
+from sudoku import solve
+from verify import check_pair, verify, zip_pairs
+
+
+PUZZLE = [list(row.replace('0', ' ')) for row in (
+    '003020600', '900305001', '001806400', '008102900', '700000008',
+    '006708200', '002609500', '800203009', '005010300')]
+SOLUTION = solve(PUZZLE)
+PUZZLE_LINE = format_board(PUZZLE, 'line')
+SOLUTION_LINE = format_board(SOLUTION, 'line')
+
+
+def test_zip_pairs_reports_a_malformed_record_and_goes_on():
+    puzzles = io.StringIO('\n'.join([PUZZLE_LINE, '12345', PUZZLE_LINE]) + '\n')
+    solutions = io.StringIO('\n'.join([SOLUTION_LINE] * 3) + '\n')
+    pairs = list(zip_pairs(puzzles, solutions))
+    assert pairs == [(PUZZLE_LINE, SOLUTION_LINE), ('', None), (PUZZLE_LINE, SOLUTION_LINE)]
+    statuses = [check_pair(puzzle, solution).status for puzzle, solution in pairs]
+    assert statuses == ['valid', 'malformed', 'valid']
+
+
+def test_zip_pairs_counts_a_bad_grid_once():
+    grid = format_board(PUZZLE)
+    bad_grid = grid.replace('700000008', '7000x0008').replace('800203009', '80020300')
+    puzzles = io.StringIO('Grid 01\n{}\nGrid 02\n{}\n'.format(bad_grid, grid))
+    solutions = io.StringIO('\n'.join([SOLUTION_LINE] * 2) + '\n')
+    statuses = [check_pair(puzzle, solution).status
+                for puzzle, solution in zip_pairs(puzzles, solutions)]
+    assert statuses == ['malformed', 'valid']
+
+
+def with_cell(line, index, val):
+    return line[:index] + val + line[index + 1:]
+
+
+def test_check_pair_valid():
+    assert check_pair(PUZZLE_LINE, SOLUTION_LINE, 7) == (7, 'valid', None, None, '')
+
+
+def test_check_pair_invalid_names_the_unit():
+    # Swapping two cells of the first row keeps the row whole but
+    # repeats a value in two columns.
+    swapped = SOLUTION_LINE[1] + SOLUTION_LINE[0] + SOLUTION_LINE[2:]
+    verdict = check_pair('0' * 81, swapped)
+    assert verdict.status == 'invalid'
+    assert verdict.unit == 'column 1'
+    assert verdict.detail == '{} repeated, missing {}'.format(SOLUTION_LINE[1], SOLUTION_LINE[0])
+
+
+def test_check_pair_mismatch_names_the_cell():
+    # r1c3 is a given 3 of the puzzle.
+    swapped = SOLUTION_LINE[:2] + SOLUTION_LINE[3] + SOLUTION_LINE[2] + SOLUTION_LINE[4:]
+    verdict = check_pair(PUZZLE_LINE, swapped)
+    assert verdict.status == 'mismatch'
+    assert verdict.cell == 'r1c3'
+    assert verdict.detail == 'given 3 changed to {}'.format(SOLUTION_LINE[3])
+
+
+def test_check_pair_incomplete_and_missing():
+    verdict = check_pair(PUZZLE_LINE, with_cell(SOLUTION_LINE, 40, '0'))
+    assert (verdict.status, verdict.cell) == ('incomplete', 'r5c5')
+    assert check_pair(PUZZLE_LINE, '').status == 'missing'
+
+
+@pytest.mark.parametrize('puzzle, solution, detail', [
+    (PUZZLE_LINE, None, 'expected a puzzle and a solution'),
+    ('', SOLUTION_LINE, 'no puzzle given'),
+    (PUZZLE_LINE, SOLUTION_LINE[:80], 'solution has 80 cells'),
+    (PUZZLE_LINE[:16], SOLUTION_LINE, 'puzzle has 16 cells, solution 81'),
+    (with_cell(PUZZLE_LINE, 0, 'x'), SOLUTION_LINE, "invalid characters ['x'] in puzzle"),
+    (PUZZLE_LINE, with_cell(SOLUTION_LINE, 80, 'A'), "invalid character 'A' in solution"),
+])
+def test_check_pair_malformed(puzzle, solution, detail):
+    verdict = check_pair(puzzle, solution)
+    assert verdict.status == 'malformed'
+    assert verdict.detail == detail
+
+
+def test_verify_takes_boards():
+    assert verify(PUZZLE, SOLUTION).status == 'valid'
+    assert verify(PUZZLE, None).status == 'malformed'
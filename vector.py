@@ -0,0 +1,154 @@
+"""
+Solve many boards at once with NumPy. A chunk of N boards is held as
+an (N, cells) array of values, one byte per cell, and every round of
+naked and hidden single propagation is a handful of array operations
+over the whole chunk at once. Most puzzles are finished by propagation
+alone, and only the boards that are still open afterwards are handed
+to the per-board search of the engine, starting from where propagation
+left them.
+
+This module needs NumPy, which the rest of the program does not.
+
+"""
+import numpy as np
+
+from batch import make_chunks
+from sudoku import geometry_for, solve
+
+
+class Tables():
+    """The geometry of a board size as NumPy index arrays."""
+    def __init__(self, geo):
+        self.geometry = geo
+        self.size = geo.size
+        # The unit ids of each cell, as (cells,) arrays.
+        self.rows = np.array(geo.row_of)
+        self.cols = np.array(geo.col_of) + geo.size
+        self.boxes = np.array(geo.box_of) + 2 * geo.size
+        # The cells of each unit, as a (units, size) array.
+        self.units = np.array(geo.units)
+        # The bit of each value, with 0 for an empty cell.
+        self.bits = np.array([0] + [1 << n for n in range(geo.size)], dtype=np.int64)
+        self.shifts = np.arange(geo.size, dtype=np.int64)
+
+tables = {}
+
+def tables_for(geo):
+    """Return the Tables of a geometry, building them on first use."""
+    if geo.box not in tables:
+        tables[geo.box] = Tables(geo)
+    return tables[geo.box]
+
+def propagate_many(cells, tab):
+    """
+    Fill the naked and hidden singles of every board of an (N, cells)
+    array in place, round after round until no board changes. Returns
+    a boolean (N,) array that is False for the boards found to have no
+    solution.
+
+    """
+    alive = np.ones(len(cells), dtype=bool)
+    # The boards still changing, by row of cells.
+    active = np.arange(len(cells))
+    all_mask = tab.geometry.all_mask
+    while len(active):
+        board = cells[active]
+        # The cells hold bytes; the masks are widened by the lookup.
+        bits = tab.bits[board]
+        unit_bits = bits[:, tab.units]
+        used = np.bitwise_or.reduce(unit_bits, axis=2)
+        # A value twice in a unit shows up as a sum larger than the OR.
+        dead = (unit_bits.sum(axis=2) != used).any(axis=1)
+
+        empty = board == 0
+        candidates = all_mask & ~(used[:, tab.rows] | used[:, tab.cols] | used[:, tab.boxes])
+        candidates[~empty] = 0
+        # (N, cells, size) flags of each candidate value of each cell.
+        flags = (candidates[:, :, None] >> tab.shifts) & 1
+        counts = flags.sum(axis=2)
+        dead |= (empty & (counts == 0)).any(axis=1)
+
+        # Naked singles: an empty cell with one candidate.
+        naked = empty & (counts == 1)
+        values = np.where(naked, flags.argmax(axis=2) + 1, 0)
+
+        # Hidden singles: a value with one place left in a unit.
+        unit_flags = flags[:, tab.units, :]
+        places = unit_flags.sum(axis=2)
+        placed = (used[:, :, None] >> tab.shifts) & 1
+        dead |= ((places == 0) & (placed == 0)).any(axis=(1, 2))
+        board_ids, unit_ids, digits = np.nonzero(places == 1)
+        positions = unit_flags[board_ids, unit_ids, :, digits].argmax(axis=1)
+        values[board_ids, tab.units[unit_ids, positions]] = digits + 1
+
+        changed = (values > 0).any(axis=1) & ~dead
+        board[changed] = np.where(values[changed] > 0, values[changed], board[changed])
+        cells[active] = board
+        alive[active[dead]] = False
+        active = active[changed]
+    return alive
+
+def to_array(boards, geo):
+    """Convert a list of boards into an (N, cells) array of byte values."""
+    values = geo.values
+    return np.array([[values[val] for row in board for val in row] for board in boards],
+                    dtype=np.uint8).reshape(len(boards), geo.num_cells)
+
+def to_board(row, geo):
+    """Convert a row of values back into a board."""
+    digits = geo.digits
+    size = geo.size
+    return [[digits[row[i*size + j]] for j in range(size)] for i in range(size)]
+
+def propagate_boards(boards):
+    """
+    Propagate a list of boards together and return the list of boards
+    left by propagation, solved or still open, with None for a board
+    found to have no solution. Boards of different sizes are propagated
+    in separate arrays.
+
+    """
+    results = [None] * len(boards)
+    by_size = {}
+    for k, board in enumerate(boards):
+        by_size.setdefault(len(board), []).append(k)
+    for ids in by_size.values():
+        geo = geometry_for(boards[ids[0]])
+        cells = to_array([boards[k] for k in ids], geo)
+        alive = propagate_many(cells, tables_for(geo))
+        for k, row, is_alive in zip(ids, cells.tolist(), alive.tolist()):
+            if is_alive:
+                results[k] = to_board(row, geo)
+    return results
+
+def is_full(board):
+    """Return True if a board has no empty cells left."""
+    return all(val != ' ' for row in board for val in row)
+
+def solve_many(boards, chunk_size=1024, stats=None, **options):
+    """
+    Solve every board of the given iterable, such as the boards of
+    puzzle_io.read_puzzles(), and yield their solutions in order, with
+    None for a board that has no solution. The boards are propagated
+    chunk_size at a time, and any board left open is solved on its own
+    by sudoku.solve() with the given options (strategy 'mrv' unless
+    another is given). If a stats dict is given, the numbers of boards
+    finished by propagation and by search are added into it.
+
+    """
+    options.setdefault('strategy', 'mrv')
+    if stats is not None:
+        stats.setdefault('propagated', 0)
+        stats.setdefault('searched', 0)
+    for chunk in make_chunks(boards, chunk_size):
+        for board in propagate_boards(chunk):
+            if board is None:
+                yield None
+            elif is_full(board):
+                if stats is not None:
+                    stats['propagated'] += 1
+                yield board
+            else:
+                if stats is not None:
+                    stats['searched'] += 1
+                yield solve(board, **options)
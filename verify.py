@@ -0,0 +1,345 @@
+"""
+Verify proposed solutions against their puzzles in bulk. Each pair is
+checked for a complete grid, for every given of the puzzle being kept,
+and for every row, column, and subgrid holding each value once. A
+failure names the exact unit or cell at fault, and the pairs are
+checked across a pool of worker processes (see batch.dispatch()).
+
+Pairs are read either from one file with a puzzle and its solution on
+each line, as one-line puzzles separated by a comma or spaces (a header
+line such as 'quizzes,solutions' is skipped), or from two puzzle files
+read side by side in any format read_puzzles() understands. Either way
+they are streamed, so the files can be far larger than memory.
+
+The report lists every failure, as CSV or, for a path ending in .json,
+as JSON with a summary of the counts.
+
+Usage: python verify.py PAIRS_FILE [--workers N] [--chunk-size N]
+                        [--unordered] [--output REPORT.csv|REPORT.json]
+       python verify.py PUZZLE_FILE SOLUTION_FILE [...]
+
+"""
+import argparse
+import csv
+import json
+import math
+import sys
+import time
+from collections import Counter, namedtuple
+from itertools import zip_longest
+from operator import itemgetter
+
+from batch import dispatch, make_chunks
+from puzzle_io import BLANKS, LINE_LENGTHS, PuzzleFormatError, format_board, read_puzzles
+from sudoku import geometry
+
+
+# Every status a pair can get, the first being the only passing one.
+STATUSES = ('valid', 'invalid', 'mismatch', 'incomplete', 'missing', 'malformed')
+# The kinds of unit, in the order of Geometry.units.
+UNIT_KINDS = ('row', 'column', 'box')
+# The columns of a CSV report.
+FIELDS = ('index', 'status', 'unit', 'cell', 'detail')
+
+# The verdict on one pair: its index in the input, its status, the
+# unit at fault (such as 'box 4'), the cell at fault (such as 'r2c7'),
+# and what is wrong. The unit and cell are None when they don't apply.
+Verdict = namedtuple('Verdict', FIELDS)
+
+
+class Checker():
+    """The tables for checking the one-line solutions of one board size."""
+    def __init__(self, geo):
+        self.geometry = geo
+        self.symbols = frozenset(geo.digits[1:])
+        self.givens = self.symbols | frozenset(BLANKS)
+        # Each unit as one C-level lookup of its cells in a string.
+        self.getters = tuple(itemgetter(*unit) for unit in geo.units)
+
+checkers = {}
+
+def checker_for(length):
+    """Return the Checker for one-line boards of the given length."""
+    if length not in checkers:
+        checkers[length] = Checker(geometry(math.isqrt(LINE_LENGTHS[length])))
+    return checkers[length]
+
+def unit_name(geo, unit_id):
+    """Name a unit for a report, counting from 1, such as 'column 3'."""
+    return '{} {}'.format(UNIT_KINDS[unit_id // geo.size], unit_id % geo.size + 1)
+
+def cell_name(geo, index):
+    """Name a cell for a report by its row and column, such as 'r2c7'."""
+    return 'r{}c{}'.format(geo.row_of[index] + 1, geo.col_of[index] + 1)
+
+def explain_unit(solution, geo, unit_id, index=None):
+    """
+    Return the Verdict for a unit of a complete solution that does not
+    hold every value: the cell where a value first repeats, and the
+    values the unit is missing.
+
+    """
+    values = geo.values
+    seen = 0
+    repeat = None
+    for cell in geo.units[unit_id]:
+        bit = 1 << (values[solution[cell]] - 1)
+        if seen & bit and repeat is None:
+            repeat = cell
+        seen |= bit
+    missing = ''.join(geo.digits[num + 1] for num in range(geo.size)
+                      if not seen & (1 << num))
+    return Verdict(index, 'invalid', unit_name(geo, unit_id), cell_name(geo, repeat),
+                   '{} repeated, missing {}'.format(solution[repeat], missing))
+
+def check_pair(puzzle, solution, index=None):
+    """
+    Check a solution against its puzzle, both given as one-line strings
+    with '0' or '.' for an empty cell, and return a Verdict. The status
+    is 'valid', or for a failure:
+
+    - 'invalid': a row, column, or subgrid repeats a value.
+    - 'mismatch': a given of the puzzle was changed.
+    - 'incomplete': the solution has an empty cell.
+    - 'missing': there is no solution for the puzzle.
+    - 'malformed': the pair can't be read as a puzzle and a solution of
+      the same size.
+
+    Solutions of the common case are checked with one set per unit;
+    the cells are only looked at one by one to explain a failure.
+
+    """
+    if solution is None:
+        return Verdict(index, 'malformed', None, None, 'expected a puzzle and a solution')
+    if not solution:
+        return Verdict(index, 'missing', None, None, 'no solution given')
+    if not puzzle:
+        return Verdict(index, 'malformed', None, None, 'no puzzle given')
+    if len(solution) not in LINE_LENGTHS:
+        return Verdict(index, 'malformed', None, None,
+                       'solution has {} cells'.format(len(solution)))
+    if len(puzzle) != len(solution):
+        return Verdict(index, 'malformed', None, None, 'puzzle has {} cells, solution {}'.format(
+            len(puzzle), len(solution)))
+
+    check = checker_for(len(solution))
+    geo = check.geometry
+    if not check.givens.issuperset(puzzle):
+        bad = sorted(set(puzzle) - check.givens)
+        return Verdict(index, 'malformed', None, cell_name(geo, puzzle.index(bad[0])),
+                       'invalid characters {} in puzzle'.format(bad))
+    if not check.symbols.issuperset(solution):
+        for cell, val in enumerate(solution):
+            if val in BLANKS or val == ' ':
+                return Verdict(index, 'incomplete', None, cell_name(geo, cell), 'empty cell')
+            if val not in check.symbols:
+                return Verdict(index, 'malformed', None, cell_name(geo, cell),
+                               'invalid character {!r} in solution'.format(val))
+
+    if puzzle != solution:
+        for cell, (given, val) in enumerate(zip(puzzle, solution)):
+            if given != val and given not in BLANKS:
+                return Verdict(index, 'mismatch', None, cell_name(geo, cell),
+                               'given {} changed to {}'.format(given, val))
+
+    size = geo.size
+    for unit_id, getter in enumerate(check.getters):
+        if len(set(getter(solution))) != size:
+            return explain_unit(solution, geo, unit_id, index)
+    return Verdict(index, 'valid', None, None, '')
+
+def to_line(board):
+    """Return a board as a one-line string, leaving strings as they are."""
+    if board is None or isinstance(board, str):
+        return board
+    return format_board(board, 'line')
+
+def verify(puzzle, solution, index=None):
+    """
+    Check a solution against its puzzle and return a Verdict (see
+    check_pair()). Either may be given as a board of rows or as a
+    one-line string.
+
+    """
+    return check_pair(to_line(puzzle), to_line(solution), index)
+
+def read_pairs(source):
+    """
+    Yield the (puzzle, solution) string pairs of a file with one pair
+    per line, separated by a comma or spaces. The source is a path, '-'
+    for stdin, or an open text file. A line with only a puzzle gives an
+    empty solution, and a line with more than two fields gives None for
+    the solution.
+
+    """
+    if source == '-':
+        yield from parse_pairs(sys.stdin)
+    elif hasattr(source, 'read'):
+        yield from parse_pairs(source)
+    else:
+        with open(source, 'r') as f_in:
+            yield from parse_pairs(f_in)
+
+def parse_pairs(f_in):
+    """Yield each pair of an open text file. See read_pairs()."""
+    for line_number, line in enumerate(f_in, 1):
+        fields = line.replace(',', ' ').split()
+        if not fields:
+            continue
+        # Skip a header line naming the columns.
+        if line_number == 1 and len(fields[0]) not in LINE_LENGTHS:
+            continue
+        if len(fields) == 1:
+            yield fields[0], ''
+        elif len(fields) == 2:
+            yield fields[0], fields[1]
+        else:
+            yield fields[0], None
+
+def read_records(source):
+    """
+    Yield each puzzle of a file as a one-line string, or the
+    PuzzleFormatError of a malformed record in its place, so that a bad
+    record keeps the rest of the file in step with its pair.
+
+    """
+    errors = []
+    for board in read_puzzles(source, on_error=errors.append):
+        yield from errors
+        errors.clear()
+        yield to_line(board)
+    yield from errors
+
+def zip_pairs(puzzle_source, solution_source):
+    """
+    Yield the (puzzle, solution) string pairs of a puzzle file and a
+    file of its solutions in the same order, read side by side. If one
+    file runs out first, the rest of the other is paired with None. A
+    malformed record in either file gives None for the solution, as a
+    malformed line of read_pairs() does.
+
+    """
+    for puzzle, solution in zip_longest(read_records(puzzle_source),
+                                        read_records(solution_source)):
+        if isinstance(puzzle, PuzzleFormatError) or isinstance(solution, PuzzleFormatError):
+            yield puzzle if isinstance(puzzle, str) else '', None
+        else:
+            yield puzzle or '', '' if solution is None else solution
+
+def verify_chunk(chunk):
+    """
+    Check a list of (index, puzzle, solution) jobs inside a worker
+    process. A valid pair is returned as just its index, which is far
+    cheaper to send back than a Verdict.
+
+    """
+    results = []
+    for index, puzzle, solution in chunk:
+        verdict = check_pair(puzzle, solution, index)
+        results.append(index if verdict.status == 'valid' else verdict)
+    return results
+
+def verify_batch(pairs, workers=None, chunk_size=1024, ordered=True):
+    """
+    Check every (puzzle, solution) pair of the given iterable, such as
+    read_pairs() or zip_pairs(), in a pool of worker processes and
+    yield a Verdict for each. Pairs are sent to the workers chunk_size
+    at a time, as in batch.solve_batch().
+
+    """
+    jobs = ((index, puzzle, solution) for index, (puzzle, solution) in enumerate(pairs))
+    for result in dispatch(verify_chunk, make_chunks(jobs, chunk_size), workers, ordered):
+        if isinstance(result, int):
+            result = Verdict(result, 'valid', None, None, '')
+        yield result
+
+class CsvReport():
+    """A report that writes a CSV row for each failure."""
+    def __init__(self, f_out):
+        self.writer = csv.writer(f_out)
+        self.writer.writerow(FIELDS)
+
+    def add(self, verdict):
+        """Record a failed pair."""
+        self.writer.writerow(verdict)
+
+    def finish(self, summary):
+        """
+        End the report. A CSV file has no place for the summary, so it
+        is left to the counts main() prints for every report.
+
+        """
+
+class JsonReport():
+    """
+    A report that writes a JSON object with a 'failures' list and a
+    'summary' of the counts. The failures are written as they come, so
+    they are never all in memory.
+
+    """
+    def __init__(self, f_out):
+        self.f_out = f_out
+        self.count = 0
+        f_out.write('{"failures": [')
+
+    def add(self, verdict):
+        """Record a failed pair."""
+        self.f_out.write(',\n  ' if self.count else '\n  ')
+        self.f_out.write(json.dumps(verdict._asdict()))
+        self.count += 1
+
+    def finish(self, summary):
+        """Write the summary and close the object."""
+        self.f_out.write('\n],\n"summary": {}}}\n'.format(json.dumps(summary, indent=2)))
+
+def main():
+    """Verify every pair of a file or two and report the failures."""
+    parser = argparse.ArgumentParser(description='Verify Sudoku solutions against their puzzles.')
+    parser.add_argument('paths', nargs='+', metavar='PATH',
+                        help="a file of puzzle and solution pairs, or a puzzle file and a "
+                             "file of its solutions; '-' reads stdin")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per core)')
+    parser.add_argument('--chunk-size', type=int, default=1024,
+                        help='pairs sent to a worker at a time (default: 1024)')
+    parser.add_argument('--unordered', action='store_true',
+                        help='report failures as they are found instead of in file order')
+    parser.add_argument('--output', default=None,
+                        help='write every failure to this CSV file, or JSON for a .json path')
+    args = parser.parse_args()
+    if len(args.paths) > 2:
+        parser.error('expected a pairs file, or a puzzle file and a solution file')
+
+    if len(args.paths) == 2:
+        pairs = zip_pairs(*args.paths)
+    else:
+        pairs = read_pairs(args.paths[0])
+    counts = Counter()
+    f_out = open(args.output, 'w', newline='') if args.output else None
+    report = None
+    if f_out is not None:
+        report = JsonReport(f_out) if args.output.endswith('.json') else CsvReport(f_out)
+    start = time.perf_counter()
+    try:
+        for verdict in verify_batch(pairs, args.workers, args.chunk_size, not args.unordered):
+            counts[verdict.status] += 1
+            if verdict.status != 'valid' and report is not None:
+                report.add(verdict)
+        elapsed = time.perf_counter() - start
+        total = sum(counts.values())
+        summary = {'pairs': total, 'seconds': round(elapsed, 3)}
+        summary.update((status, counts[status]) for status in STATUSES)
+        if report is not None:
+            report.finish(summary)
+    finally:
+        if f_out is not None:
+            f_out.close()
+
+    print('Verified {} pairs in {:.3f}s ({:.1f} pairs/s)'.format(
+        total, elapsed, total / elapsed if elapsed else 0.0))
+    print(', '.join('{}: {}'.format(status, counts[status]) for status in STATUSES))
+    if total != counts['valid']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()